@@ -1,16 +1,23 @@
 import requests
 import time
-import json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from urllib.parse import urlparse
 import re
 
+import json_backend
+from json_backend import RawJSON
+from rate_limit import RateLimitExceeded, default_limiter
+from retry_policy import RequestPolicy, default_policy_state
+from transport import Transport, get_transport
+from uploads import FILE_REFERENCE, FileBody, MultipartBody, parse_form_lines
+
 
 class ApiClient:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'PostmanClone/1.0'
-        })
+    def __init__(self, limiter=None, policy_state=None, transport='http1'):
+        self.limiter = limiter or default_limiter
+        self.policy_state = policy_state or default_policy_state
+        # A Transport instance, or the name of a process-wide one ('http1', 'http2')
+        self.transport = transport if isinstance(transport, Transport) else get_transport(transport)
 
     def replace_environment_variables(self, text, environment_vars):
         """Replace {{variable}} patterns with environment variable values"""
@@ -46,10 +53,175 @@ class ApiClient:
         
         return url
 
+    def is_json_response(self, response):
+        """Check whether the upstream declared a JSON body"""
+        content_type = response.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        return content_type == 'application/json' or content_type.endswith('+json')
+
+    def error_kind(self, error):
+        """Classify a failed attempt for retry policies"""
+        if isinstance(error, requests.exceptions.Timeout):
+            return 'timeout'
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return 'connection'
+        if isinstance(error, RateLimitExceeded):
+            return 'throttled'
+        return 'request'
+
+    def retry_after(self, response):
+        """Seconds from a numeric Retry-After header, if present"""
+        try:
+            return float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            return None
+
+    def attempt(self, request_kwargs, host, user_id, hedged=False):
+        """Make one upstream call; returns (response, error, throttle, record).
+
+        elapsed covers the upstream call only; time spent waiting for the
+        limiter is recorded separately as queued_seconds.
+        """
+        queued_at = time.time()
+        started = None
+        record = {'hedged': hedged}
+        try:
+            with self.limiter.acquire(host, user_id) as throttle:
+                started = time.time()
+                response = self.transport.request(**request_kwargs)
+                elapsed = time.time() - started
+        except (requests.exceptions.RequestException, RateLimitExceeded) as e:
+            now = time.time()
+            record.update({
+                'outcome': 'error',
+                'error_kind': self.error_kind(e),
+                'error': str(e),
+                'queued_seconds': (started or now) - queued_at,
+                'elapsed': now - started if started is not None else 0.0
+            })
+            return None, e, None, record
+
+        self.policy_state.latency.record(host, elapsed)
+        record.update({
+            'outcome': 'response',
+            'status_code': response.status_code,
+            'queued_seconds': started - queued_at,
+            'elapsed': elapsed
+        })
+        return response, None, throttle, record
+
+    def response_time(self, start_time, attempts):
+        """Time since start_time, less the time attempts spent queued for the
+        limiter (hedged duplicates queue while the first attempt is in flight,
+        so only the sequential attempts count)"""
+        queued = sum(record.get('queued_seconds', 0.0) for record in attempts if not record.get('hedged'))
+        return time.time() - start_time - queued
+
+    def record_attempt(self, attempts, record):
+        record['attempt'] = len(attempts) + 1
+        attempts.append(record)
+
+    def send_hedged(self, request_kwargs, host, user_id, policy, budget, attempts):
+        """Send a duplicate if the first attempt is slower than the hedge delay
+        (default: the host's p95) and take whichever response arrives first"""
+        delay = policy.hedge_delay
+        if delay is None:
+            delay = self.policy_state.latency.percentile(host, 95, policy.hedge_min_samples)
+        if delay is None:
+            result = self.attempt(request_kwargs, host, user_id)
+            self.record_attempt(attempts, result[3])
+            return result
+
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            futures = [pool.submit(self.attempt, request_kwargs, host, user_id)]
+            done, _ = wait(futures, timeout=delay)
+            if not done and budget.withdraw():
+                futures.append(pool.submit(self.attempt, request_kwargs, host, user_id, True))
+
+            result = None
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                result = next(iter(done)).result()
+                if result[1] is None:
+                    break
+
+            for future in futures:
+                if future.done():
+                    record = future.result()[3]
+                    record['winner'] = future.result() is result
+                else:
+                    # The slower request keeps running in the background; its result is discarded
+                    record = {'hedged': future is not futures[0], 'outcome': 'abandoned'}
+                self.record_attempt(attempts, record)
+            return result
+        finally:
+            pool.shutdown(wait=False)
+
+    def dispatch(self, request_kwargs, host, user_id, policy, attempts):
+        """Send according to the policy, appending every attempt to attempts.
+
+        Returns (response, throttle) or raises the last attempt's error.
+        """
+        method = request_kwargs['method']
+        budget = self.policy_state.budget(host, policy)
+        budget.deposit()
+        retries = 0
+
+        while True:
+            if policy.can_hedge(method):
+                response, error, throttle, _ = self.send_hedged(
+                    request_kwargs, host, user_id, policy, budget, attempts)
+            else:
+                response, error, throttle, record = self.attempt(request_kwargs, host, user_id)
+                self.record_attempt(attempts, record)
+
+            retry_after = None
+            if error is not None:
+                retryable = self.error_kind(error) in policy.retry_errors
+            else:
+                retryable = response.status_code in policy.retry_statuses
+                retry_after = self.retry_after(response)
+
+            if not retryable or retries >= policy.max_retries or not policy.can_retry(method):
+                break
+            if not budget.withdraw():
+                attempts[-1]['retry_budget_exhausted'] = True
+                break
+
+            retries += 1
+            backoff = policy.backoff(retries, retry_after)
+            attempts[-1]['backoff'] = backoff
+            time.sleep(backoff)
+
+        if error is not None:
+            raise error
+        return response, throttle
+
+    def resolve_file(self, reference, files):
+        """Look up an "@file:<id>" reference in the files mapping"""
+        match = FILE_REFERENCE.match(reference.strip())
+        file_info = (files or {}).get(int(match.group(1))) if match else None
+        if file_info is None:
+            raise ValueError(f'Unknown file reference: {reference.strip()}')
+        return file_info
+
     def send_request(self, method, url, headers=None, body=None, body_type='json', 
-                    auth_type=None, auth_data=None, environment_vars=None):
-        """Send HTTP request and return response data"""
+                    auth_type=None, auth_data=None, environment_vars=None, passthrough=False,
+                    user_id=None, policy=None, files=None):
+        """Send HTTP request and return response data
+
+        With passthrough=True a valid JSON response body is returned as RawJSON,
+        so it is forwarded and stored as the upstream bytes without being
+        re-encoded (it is still parsed once to validate it).
+        policy is a RequestPolicy controlling timeouts, retries and hedging;
+        every attempt made is listed under 'attempts' in the result.
+        files maps uploaded file ids to {'path', 'filename', 'content_type'} for
+        binary and multipart bodies, which are streamed from disk.
+        """
         start_time = time.time()
+        policy = policy or RequestPolicy()
+        attempts = []
         
         try:
             # Replace environment variables
@@ -74,45 +246,62 @@ class ApiClient:
                 'method': method.upper(),
                 'url': prepared_url,
                 'headers': prepared_headers,
-                'timeout': 30,
+                'timeout': policy.timeout,
                 'allow_redirects': True
             }
 
             # Prepare body based on type
             if body and method.upper() in ['POST', 'PUT', 'PATCH']:
                 if body_type == 'json':
-                    try:
-                        request_kwargs['json'] = json.loads(body)
-                    except json.JSONDecodeError:
-                        request_kwargs['data'] = body
-                        if 'Content-Type' not in prepared_headers:
-                            prepared_headers['Content-Type'] = 'application/json'
+                    # Send the body as typed rather than parsing and re-encoding it
+                    request_kwargs['data'] = body.encode('utf-8')
+                    if 'Content-Type' not in prepared_headers:
+                        prepared_headers['Content-Type'] = 'application/json'
                 elif body_type == 'form':
                     # Parse form data
-                    form_data = {}
-                    for line in body.split('\n'):
-                        if '=' in line:
-                            key, value = line.split('=', 1)
-                            form_data[key.strip()] = value.strip()
-                    request_kwargs['data'] = form_data
+                    request_kwargs['data'] = dict(parse_form_lines(body))
+                elif body_type == 'binary':
+                    file_info = self.resolve_file(body, files)
+                    request_kwargs['data'] = FileBody(file_info['path'])
+                    if 'Content-Type' not in prepared_headers:
+                        prepared_headers['Content-Type'] = file_info.get('content_type') or 'application/octet-stream'
+                elif body_type == 'multipart':
+                    fields = []
+                    for key, value in parse_form_lines(body):
+                        if FILE_REFERENCE.match(value):
+                            value = self.resolve_file(value, files)
+                        fields.append((key, value))
+                    multipart = MultipartBody(fields)
+                    request_kwargs['data'] = multipart
+                    prepared_headers['Content-Type'] = multipart.content_type
                 else:  # raw
                     request_kwargs['data'] = body
 
-            # Send request
-            response = self.session.request(**request_kwargs)
-            response_time = time.time() - start_time
+            # Send request with retries/hedging, subject to per-host and per-user limits
+            host = urlparse(prepared_url).hostname
+            response, throttle = self.dispatch(request_kwargs, host, user_id, policy, attempts)
+            response_time = self.response_time(start_time, attempts)
 
             # Parse response
             response_headers = dict(response.headers)
             
-            try:
-                # Try to parse as JSON
-                response_body = response.json()
-                content_type = 'application/json'
-            except:
-                # Fallback to text
-                response_body = response.text
-                content_type = response.headers.get('Content-Type', 'text/plain')
+            response_body = None
+            if passthrough and response.content and self.is_json_response(response):
+                try:
+                    response_body = RawJSON.checked(response.content)
+                    content_type = 'application/json'
+                except ValueError:
+                    # Mislabelled or non-UTF-8 body: handle it like any other
+                    pass
+            if response_body is None:
+                try:
+                    # Try to parse as JSON
+                    response_body = json_backend.loads(response.content)
+                    content_type = 'application/json'
+                except ValueError:
+                    # Fallback to text
+                    response_body = response.text
+                    content_type = response.headers.get('Content-Type', 'text/plain')
 
             return {
                 'success': True,
@@ -123,6 +312,9 @@ class ApiClient:
                 'content_type': content_type,
                 'response_time': response_time,
                 'size': len(response.content),
+                'protocol': response.protocol,
+                'throttle': throttle,
+                'attempts': attempts,
                 'request': {
                     'method': method.upper(),
                     'url': prepared_url,
@@ -131,27 +323,39 @@ class ApiClient:
                 }
             }
 
+        except RateLimitExceeded as e:
+            return {
+                'success': False,
+                'error': f'Throttled: {str(e)}',
+                'throttle': {'rejected': True, 'scope': e.scope, 'key': e.key},
+                'response_time': self.response_time(start_time, attempts),
+                'attempts': attempts
+            }
         except requests.exceptions.Timeout:
             return {
                 'success': False,
                 'error': 'Request timeout',
-                'response_time': time.time() - start_time
+                'response_time': self.response_time(start_time, attempts),
+                'attempts': attempts
             }
         except requests.exceptions.ConnectionError:
             return {
                 'success': False,
                 'error': 'Connection error - Unable to reach the server',
-                'response_time': time.time() - start_time
+                'response_time': self.response_time(start_time, attempts),
+                'attempts': attempts
             }
         except requests.exceptions.RequestException as e:
             return {
                 'success': False,
                 'error': f'Request error: {str(e)}',
-                'response_time': time.time() - start_time
+                'response_time': self.response_time(start_time, attempts),
+                'attempts': attempts
             }
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Unexpected error: {str(e)}',
-                'response_time': time.time() - start_time
+                'response_time': self.response_time(start_time, attempts),
+                'attempts': attempts
             }
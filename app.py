@@ -1,40 +1,119 @@
 import os
 import logging
 
+import click
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+import json_backend
+from rate_limit import default_limiter
+from schema import add_missing_columns
+from sqlite_tuning import is_sqlite_uri, sqlite_engine_options, install_sqlite_pragmas, history_writer
+
 
 class Base(DeclarativeBase):
     pass
 
 db = SQLAlchemy(model_class=Base)
 
-# create the app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET") or "dev-secret-key-change-in-production"
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# configure the database, relative to the app instance folder
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///postman_clone.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by json_backend (orjson when installed)"""
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.pop('ensure_ascii', None)
+        return json_backend.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return json_backend.loads(s)
+
+
+def configure_logging():
+    """Production logging unless LOG_LEVEL says otherwise; leaves existing
+    handlers (e.g. gunicorn's) alone"""
+    level = os.environ.get("LOG_LEVEL", "INFO").upper()
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(level=level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    else:
+        root.setLevel(level)
+
+
+def create_app(config=None):
+    """Create and configure the application"""
+    configure_logging()
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.secret_key = os.environ.get("SESSION_SECRET") or "dev-secret-key-change-in-production"
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+    # configure the database, relative to the app instance folder
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///postman_clone.db")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+
+    # forward valid upstream JSON bodies verbatim instead of re-encoding them
+    app.config["JSON_PASSTHROUGH"] = os.environ.get("JSON_PASSTHROUGH", "").lower() in ("1", "true", "yes")
 
-# initialize the app with the extension
-db.init_app(app)
+    # server-side storage for uploaded request bodies
+    app.config["UPLOAD_FOLDER"] = os.environ.get("UPLOAD_FOLDER") or os.path.join(app.instance_path, "uploads")
 
-with app.app_context():
-    # Import models and routes
+    # outbound transport: "http1" (requests) or "http2" (httpx, multiplexed)
+    app.config["HTTP_TRANSPORT"] = os.environ.get("HTTP_TRANSPORT", "http1")
+
+    # WAL/pragmas and serialized history writes on SQLite (SQLITE_TUNING=0 to compare without)
+    app.config["SQLITE_TUNING"] = os.environ.get("SQLITE_TUNING", "1").lower() not in ("0", "false", "no")
+
+    if config:
+        app.config.update(config)
+    tune_sqlite = app.config["SQLITE_TUNING"] and is_sqlite_uri(app.config["SQLALCHEMY_DATABASE_URI"])
+    if tune_sqlite:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"].update(sqlite_engine_options())
+
+    # outbound rate limits, e.g.
+    # {"hosts": {"api.example.com": {"rate": 5, "max_in_flight": 2}}, "users": {"*": {"rate": 20, "policy": "reject"}}}
+    if os.environ.get("OUTBOUND_RATE_LIMITS"):
+        outbound_limits = json_backend.loads(os.environ["OUTBOUND_RATE_LIMITS"])
+        default_limiter.configure(hosts=outbound_limits.get("hosts"), users=outbound_limits.get("users"))
+
+    # initialize the app with the extension
+    db.init_app(app)
+
+    with app.app_context():
+        if tune_sqlite and db.engine.dialect.name == 'sqlite':
+            install_sqlite_pragmas(db.engine)
+        history_writer.enabled = tune_sqlite
+
+    # Import models and routes only once an app exists
     import models  # noqa: F401
-    import routes  # noqa: F401
-    
-    db.create_all()
+    import routes
+    from auth import login_manager
+
+    login_manager.init_app(app)
+    routes.init_app(app)
+
+    @app.cli.command("init-db")
+    def init_db():
+        """Create missing tables and columns"""
+        db.create_all()
+        added = add_missing_columns(db.engine, db.metadata)
+        click.echo(f"Database ready ({', '.join(added) or 'no columns added'})")
+
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups():
+        """Recompute endpoint rollups from request history"""
+        import rollups
+        count = rollups.rebuild()
+        click.echo(f"Rolled up {count} history entries")
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    return app
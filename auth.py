@@ -1,12 +1,11 @@
 from functools import wraps
 from flask import render_template, request, redirect, url_for, flash, session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from app import app, db
+from app import db
 from models import User
 
-# Initialize Flask-Login
+# Flask-Login, bound to the app in create_app()
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'info'
@@ -0,0 +1,103 @@
+"""Minimal cleartext HTTP/2 (h2c, prior knowledge) stand-in server for benchmarks.
+
+Answers every request with a small JSON body after an optional delay, and
+counts the TCP connections it accepted.
+
+    python benchmarks/h2_server.py [--port 8443] [--delay 0.05]
+"""
+import argparse
+import asyncio
+import threading
+
+from h2.config import H2Configuration
+from h2.connection import H2Connection
+from h2.events import ConnectionTerminated, DataReceived, StreamEnded
+
+BODY = b'{"ok": true}'
+
+
+class H2Protocol(asyncio.Protocol):
+    def __init__(self, server):
+        self.server = server
+        self.conn = H2Connection(H2Configuration(client_side=False, header_encoding='utf-8'))
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections += 1
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, DataReceived):
+                self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, StreamEnded):
+                asyncio.ensure_future(self.respond(event.stream_id))
+            elif isinstance(event, ConnectionTerminated):
+                self.transport.close()
+        self.transport.write(self.conn.data_to_send())
+
+    async def respond(self, stream_id):
+        if self.server.delay:
+            await asyncio.sleep(self.server.delay)
+        if self.transport.is_closing():
+            return
+        self.conn.send_headers(stream_id, [
+            (':status', '200'),
+            ('content-type', 'application/json'),
+            ('content-length', str(len(BODY))),
+        ])
+        self.conn.send_data(stream_id, BODY, end_stream=True)
+        self.server.requests += 1
+        self.transport.write(self.conn.data_to_send())
+
+
+class H2Server:
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self._loop = None
+        self._server = None
+
+    def start(self):
+        """Serve from a background thread; returns once the port is bound"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(
+                self._loop.create_server(lambda: H2Protocol(self), self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = H2Server(port=args.port, delay=args.delay).start()
+    print(f'Serving h2c on {server.url}')
+    threading.Event().wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Concurrent history-insert throughput against SQLite, default vs tuned profile.
+
+Simulates several gunicorn workers (processes), each with a few threads,
+writing to the same database file. Two targets:
+
+  insert        bare SQL inserts of RequestHistory-sized rows
+  send_request  POST /send_request through create_app() against a local
+                upstream, so the timing covers the app's engine setup, the
+                ORM/JSONField flush, history_writer and the rollup update
+
+    python benchmarks/sqlite_history_throughput.py [--workers 4] [--threads 4] [--writes 200]
+    python benchmarks/sqlite_history_throughput.py --target send_request --writes 50
+"""
+import argparse
+import http.server
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from sqlite_tuning import SingleWriter, install_sqlite_pragmas, sqlite_engine_options
+
+PAYLOAD = json.dumps({'body': 'x' * 2048, 'headers': {'Content-Type': 'application/json'}})
+
+
+def make_engine(path, tuned):
+    url = f'sqlite:///{path}'
+    if tuned:
+        return install_sqlite_pragmas(create_engine(url, **sqlite_engine_options()))
+    # Driver default: 5s busy timeout, rollback journal, synchronous=FULL
+    return create_engine(url, pool_pre_ping=True)
+
+
+def worker(path, tuned, threads, writes, results):
+    engine = make_engine(path, tuned)
+    writer = SingleWriter()
+    writer.enabled = tuned
+    ok = [0]
+    locked = [0]
+    counter_lock = threading.Lock()
+
+    def run():
+        for _ in range(writes):
+            try:
+                with writer():
+                    with engine.begin() as conn:
+                        conn.execute(
+                            text('INSERT INTO request_history (request_data, response_data, user_id) '
+                                 'VALUES (:req, :resp, 1)'),
+                            {'req': PAYLOAD, 'resp': PAYLOAD},
+                        )
+                        # Simulate the history page reading concurrently
+                        conn.execute(text('SELECT COUNT(*) FROM request_history')).scalar()
+                with counter_lock:
+                    ok[0] += 1
+            except OperationalError:
+                with counter_lock:
+                    locked[0] += 1
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put((ok[0], locked[0]))
+
+
+def run_profile(tuned, workers, threads, writes):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        engine = make_engine(path, tuned)
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE request_history (id INTEGER PRIMARY KEY, '
+                              'request_data TEXT NOT NULL, response_data TEXT, user_id INTEGER NOT NULL)'))
+        engine.dispose()
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker, args=(path, tuned, threads, writes, results))
+                 for _ in range(workers)]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        ok = locked = 0
+        for _ in procs:
+            a, b = results.get()
+            ok += a
+            locked += b
+        return ok, locked, elapsed
+
+
+class UpstreamHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = PAYLOAD.encode('utf-8')
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_upstream():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), UpstreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_app(path, tuned):
+    from app import create_app
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLITE_TUNING': tuned,
+        'WTF_CSRF_ENABLED': False,
+    })
+
+
+def app_worker(path, tuned, threads, writes, upstream_url, results):
+    app = make_app(path, tuned)
+    ok = [0]
+    failed = [0]
+    counter_lock = threading.Lock()
+    clients = []
+    for _ in range(threads):
+        client = app.test_client()
+        client.post('/login', data={'username': 'bench', 'password': 'benchmark'})
+        clients.append(client)
+
+    def run(client):
+        for _ in range(writes):
+            response = client.post('/send_request', data={'method': 'GET', 'url': upstream_url})
+            with counter_lock:
+                if response.status_code == 200 and response.get_json().get('success'):
+                    ok[0] += 1
+                else:
+                    failed[0] += 1
+
+    pool = [threading.Thread(target=run, args=(client,)) for client in clients]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put((ok[0], failed[0], time.perf_counter() - start))
+
+
+def run_app_profile(tuned, workers, threads, writes, upstream_url):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        app = make_app(path, tuned)
+        from app import db
+        from models import User
+        with app.app_context():
+            db.create_all()
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('benchmark')
+            db.session.add(user)
+            db.session.commit()
+            db.engine.dispose()
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=app_worker,
+                                         args=(path, tuned, threads, writes, upstream_url, results))
+                 for _ in range(workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+        # Workers time only their request loop (not app start-up); they run
+        # concurrently, so the slowest one bounds the wall time
+        ok = failed = 0
+        elapsed = 0.0
+        for _ in procs:
+            a, b, seconds = results.get()
+            ok += a
+            failed += b
+            elapsed = max(elapsed, seconds)
+        return ok, failed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--writes', type=int, default=200, help='inserts or requests per thread')
+    parser.add_argument('--target', choices=['insert', 'send_request', 'both'], default='both')
+    args = parser.parse_args()
+
+    if args.target in ('insert', 'both'):
+        print('insert')
+        for label, tuned in (('default', False), ('tuned', True)):
+            ok, locked, elapsed = run_profile(tuned, args.workers, args.threads, args.writes)
+            print(f'  {label:8s} {ok:6d} ok  {locked:4d} locked  {elapsed:7.2f}s  {ok / elapsed:9.1f} writes/s')
+
+    if args.target in ('send_request', 'both'):
+        upstream = start_upstream()
+        upstream_url = f'http://127.0.0.1:{upstream.server_address[1]}/'
+        print('send_request')
+        for label, tuned in (('default', False), ('tuned', True)):
+            ok, failed, elapsed = run_app_profile(tuned, args.workers, args.threads, args.writes, upstream_url)
+            print(f'  {label:8s} {ok:6d} ok  {failed:4d} failed  {elapsed:7.2f}s  {ok / elapsed:9.1f} requests/s')
+        upstream.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Cold-start cost of a gunicorn worker (create_app) and of importing api_client alone.
+
+Each measurement runs in a fresh interpreter so import caches do not carry over.
+
+    python benchmarks/startup_time.py [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPETS = {
+    'import api_client': 'import api_client',
+    'worker boot (main:app)': 'import main',
+}
+
+TIMER = '''
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+'''
+
+
+def measure(code, runs, env):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', TIMER.format(code=code)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{os.path.join(tmp, "bench.db")}')
+        for label, code in SNIPPETS.items():
+            samples = measure(code, args.runs, env)
+            print(f'{label:24s} median {statistics.median(samples) * 1000:7.1f} ms  '
+                  f'min {min(samples) * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
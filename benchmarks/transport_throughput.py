@@ -0,0 +1,90 @@
+"""Concurrent request throughput: HTTP/1.1 connection pool vs HTTP/2 multiplexing.
+
+Both transports hit local stand-in servers that answer after the same delay;
+the report includes how many TCP connections each server accepted.
+
+    python benchmarks/transport_throughput.py [--requests 500] [--concurrency 50] [--delay 0.02]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from api_client import ApiClient
+from benchmarks.h2_server import BODY, H2Server
+from transport import HTTP2Transport, RequestsTransport
+
+
+def start_http1_server(delay):
+    stats = {'connections': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            stats['connections'] += 1
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def run(client, url, total, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: client.send_request('GET', url), range(total)))
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for r in results if r['success'])
+    protocols = sorted({r.get('protocol') for r in results if r['success']})
+    return ok, elapsed, protocols
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.02, help='server think time (seconds)')
+    args = parser.parse_args()
+
+    http1_server, http1_stats = start_http1_server(args.delay)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount('http://', adapter)
+    client = ApiClient(transport=RequestsTransport(session))
+    url = f'http://127.0.0.1:{http1_server.server_address[1]}/'
+    ok, elapsed, protocols = run(client, url, args.requests, args.concurrency)
+    print(f'http1  {ok:5d} ok  {elapsed:6.2f}s  {ok / elapsed:8.1f} req/s  '
+          f'{http1_stats["connections"]:4d} connections  {protocols}')
+    http1_server.shutdown()
+
+    h2_server = H2Server(delay=args.delay).start()
+    client = ApiClient(transport=HTTP2Transport(prior_knowledge=True))
+    ok, elapsed, protocols = run(client, h2_server.url + '/', args.requests, args.concurrency)
+    print(f'http2  {ok:5d} ok  {elapsed:6.2f}s  {ok / elapsed:8.1f} req/s  '
+          f'{h2_server.connections:4d} connections  {protocols}')
+    h2_server.stop()
+
+
+if __name__ == '__main__':
+    main()
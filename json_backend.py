@@ -0,0 +1,115 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+_ORJSON_OPTIONS = 0
+if orjson is not None:
+    # Keep stdlib semantics: non-string keys are coerced and datetimes go through
+    # the caller's default (Flask formats them as HTTP dates)
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+_HAS_FRAGMENT = orjson is not None and hasattr(orjson, 'Fragment')
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+class RawJSON:
+    """Already-encoded JSON that dumps() emits verbatim instead of re-encoding.
+
+    Used to forward upstream response bodies without re-encoding them. The
+    content is trusted to be valid JSON; use checked() for data from elsewhere.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        self.data = data
+
+    @classmethod
+    def checked(cls, data):
+        """RawJSON for data, raising ValueError unless it is valid UTF-8 JSON.
+
+        This still parses data once (the result is discarded); what callers
+        save is building Python objects for later use and encoding them again.
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        if orjson is not None:
+            orjson.loads(data)
+        else:
+            json.loads(data, parse_constant=_reject_constant)
+        return cls(data)
+
+    def parse(self):
+        return loads(self.data)
+
+    def __repr__(self):
+        return f'RawJSON({self.data[:40]!r})'
+
+
+def _reject_constant(name):
+    raise ValueError(f'{name} is not valid JSON')
+
+
+def _orjson_options(sort_keys, indent=None, separators=None, **kwargs):
+    """orjson options equivalent to the stdlib arguments, or None if there
+    are none (orjson output is compact, or indented by two spaces)"""
+    if kwargs:
+        return None
+    options = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    if indent is None and separators in (None, (',', ':')):
+        return options
+    if indent == 2 and separators in (None, (',', ': ')):
+        return options | orjson.OPT_INDENT_2
+    return None
+
+
+def loads(data):
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Fall through for inputs orjson rejects but stdlib accepts
+            # (NaN, non-UTF-8 encodings)
+            pass
+    return json.loads(data)
+
+
+def dumps(obj, default=None, sort_keys=False, **kwargs):
+    """Serialize to a JSON str, splicing any RawJSON values in unchanged.
+
+    Compact separators and indent=2 are handled by orjson; other keyword
+    arguments select the stdlib encoder.
+    """
+    raw_values = []
+
+    def encode_default(value):
+        if isinstance(value, RawJSON):
+            if _HAS_FRAGMENT:
+                return orjson.Fragment(value.data)
+            raw_values.append(value.data)
+            return f'\x00rawjson{len(raw_values) - 1}\x00'
+        if default is not None:
+            return default(value)
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+    result = None
+    options = _orjson_options(sort_keys, **kwargs) if orjson is not None else None
+    if options is not None:
+        try:
+            result = orjson.dumps(obj, default=encode_default, option=options).decode('utf-8')
+        except TypeError:
+            # Integers beyond 64 bits and similar: let the stdlib handle it
+            raw_values.clear()
+    if result is None:
+        result = json.dumps(obj, default=encode_default, sort_keys=sort_keys, **kwargs)
+
+    for index, data in enumerate(raw_values):
+        result = result.replace(f'"\\u0000rawjson{index}\\u0000"', data, 1)
+    return result
@@ -0,0 +1,174 @@
+import weakref
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+
+import json_backend
+
+
+_CACHE_KEY = '_json_field_cache'
+_FIELDS_BY_CLASS = {}
+
+
+class _Entry:
+    __slots__ = ('raw', 'value', 'pending')
+
+    def __init__(self, raw, value, pending=False):
+        self.raw = raw
+        self.value = value
+        self.pending = pending
+
+
+class TrackedDict(dict):
+    """Dict that marks its owning JSON field dirty when mutated (top level only)"""
+
+    def __init__(self, data, owner, field):
+        super().__init__(data)
+        self._owner = weakref.ref(owner)
+        self._field = field
+
+    def _changed(self):
+        owner = self._owner()
+        if owner is not None:
+            self._field.mark_dirty(owner)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        self._changed()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self._changed()
+        return result
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class JSONField:
+    """Descriptor exposing a JSON object stored in a text column as a dict.
+
+    The column is parsed on first access and memoized on the instance for as
+    long as the underlying text is unchanged. Assignments and in-place
+    mutations mark the instance dirty and are serialized back into the column
+    only when the session flushes. Text that does not parse to an object
+    reads as {}.
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def _cache(self, instance):
+        cache = instance.__dict__.get(_CACHE_KEY)
+        if cache is None:
+            cache = instance.__dict__[_CACHE_KEY] = {}
+        return cache
+
+    def _wrap(self, instance, value):
+        if isinstance(value, dict) and not isinstance(value, TrackedDict):
+            return TrackedDict(value, instance, self)
+        return value
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        cache = self._cache(instance)
+        entry = cache.get(self.name)
+        if entry is not None and entry.pending:
+            return entry.value
+
+        raw = getattr(instance, self.column)
+        if entry is not None and (entry.raw is raw or entry.raw == raw):
+            return entry.value
+
+        value = {}
+        if raw:
+            try:
+                value = json_backend.loads(raw)
+            except ValueError:
+                value = {}
+            if not isinstance(value, dict):
+                # Rows written before objects were enforced
+                value = {}
+        value = self._wrap(instance, value)
+        cache[self.name] = _Entry(raw, value)
+        return value
+
+    def __set__(self, instance, value):
+        if not isinstance(value, dict):
+            raise ValueError(f'{self.column} must be a JSON object, got {type(value).__name__}')
+        cache = self._cache(instance)
+        cache[self.name] = _Entry(None, self._wrap(instance, value), pending=True)
+        self.mark_dirty(instance)
+
+    def mark_dirty(self, instance):
+        """Flag the column as modified so the next flush re-serializes it"""
+        entry = self._cache(instance).get(self.name)
+        if entry is None:
+            return
+        entry.pending = True
+        if self.column in inspect(instance).dict:
+            flag_modified(instance, self.column)
+        else:
+            # Column not loaded (transient or expired): register a change so the
+            # instance is picked up by the flush, which writes the real value
+            setattr(instance, self.column, None)
+
+    def flush(self, instance):
+        """Serialize a pending value into the column"""
+        entry = instance.__dict__.get(_CACHE_KEY, {}).get(self.name)
+        if entry is None or not entry.pending:
+            return
+        raw = json_backend.dumps(entry.value)
+        setattr(instance, self.column, raw)
+        entry.raw = raw
+        entry.pending = False
+
+
+def json_fields(cls):
+    """All JSONField descriptors declared on a class"""
+    fields = _FIELDS_BY_CLASS.get(cls)
+    if fields is None:
+        fields = _FIELDS_BY_CLASS[cls] = [
+            attr for klass in cls.__mro__ for attr in vars(klass).values()
+            if isinstance(attr, JSONField)
+        ]
+    return fields
+
+
+@event.listens_for(Session, 'before_flush')
+def serialize_pending_json(session, flush_context, instances):
+    for instance in list(session.new) + list(session.dirty):
+        if _CACHE_KEY not in instance.__dict__:
+            continue
+        for field in json_fields(type(instance)):
+            field.flush(instance)
@@ -0,0 +1,448 @@
+"""Serve saved requests' example responses and recorded history as a mock API.
+
+    python mock_server.py --collection-file collection.json --port 8080
+    python mock_server.py --collection-id 3 --workers 4 --latency-ms 20 --jitter-ms 10
+    python mock_server.py --user-id 1 --history --error-rate 0.05
+
+Requests are matched on method, path, query and (optionally) headers through
+an index built once at startup: exact paths are a dict lookup and templated
+paths ({{var}} or :var segments) are resolved through a segment trie. Running
+from a collection file does not load Flask or the database.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+from urllib.parse import parse_qsl, urlsplit
+
+import json_backend
+
+
+# Recorded response headers that describe the original transfer, not the payload
+SKIP_RESPONSE_HEADERS = {
+    'connection', 'content-encoding', 'content-length', 'date', 'keep-alive',
+    'server', 'transfer-encoding',
+}
+
+REASONS = {200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request', 401: 'Unauthorized',
+           403: 'Forbidden', 404: 'Not Found', 429: 'Too Many Requests', 500: 'Internal Server Error',
+           502: 'Bad Gateway', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+# Marks an example without a body, as distinct from a JSON null body
+_NO_BODY = object()
+
+
+def is_placeholder(value):
+    return (value.startswith('{{') and value.endswith('}}')) or value.startswith(':')
+
+
+def is_json_type(content_type):
+    return 'json' in (content_type or '').split(';')[0].lower()
+
+
+def split_url(url):
+    """Path and query of a saved URL, dropping a scheme/host or a leading
+    {{base_url}}-style variable"""
+    url = (url or '').strip()
+    if url.startswith('{{') and '}}' in url:
+        url = url[url.index('}}') + 2:]
+    parts = urlsplit(url if '://' in url or url.startswith('/') else '/' + url)
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+    return path, parse_qsl(parts.query, keep_blank_values=True)
+
+
+class MockResponse:
+    """A response rendered to bytes once, when the index is built"""
+
+    def __init__(self, status_code=200, headers=None, body=_NO_BODY, content_type=None):
+        self.status_code = int(status_code or 200)
+        if body is _NO_BODY:
+            payload = b''
+        elif isinstance(body, str) and not is_json_type(content_type):
+            payload = body.encode('utf-8')
+        else:
+            # Parsed JSON of any type (including strings recorded from a JSON response)
+            payload = json_backend.dumps(body).encode('utf-8')
+            if not is_json_type(content_type):
+                content_type = 'application/json'
+
+        headers = {k: v for k, v in (headers or {}).items() if k.lower() not in SKIP_RESPONSE_HEADERS}
+        if content_type and not any(k.lower() == 'content-type' for k in headers):
+            headers['Content-Type'] = content_type
+        headers['Content-Length'] = str(len(payload))
+
+        head = f'HTTP/1.1 {self.status_code} {REASONS.get(self.status_code, "Status")}\r\n'
+        head += ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+        self.head = head.encode('latin-1', 'replace')
+        self.body = payload
+
+    def render(self, keep_alive):
+        return self.head + (b'Connection: keep-alive\r\n\r\n' if keep_alive else b'Connection: close\r\n\r\n') + self.body
+
+
+class MockRoute:
+    def __init__(self, method, url, response, match_headers=None, latency_ms=None, error_rate=None, source=''):
+        self.method = (method or 'GET').upper()
+        self.path, query = split_url(url)
+        self.segments = [s for s in self.path.split('/') if s]
+        # None means the parameter must be present with any value
+        self.query = {k: (None if is_placeholder(v) else v) for k, v in query}
+        self.headers = {k.lower(): (None if is_placeholder(str(v)) else str(v))
+                        for k, v in (match_headers or {}).items()}
+        self.response = response
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.source = source
+
+    @property
+    def is_template(self):
+        return any(is_placeholder(s) for s in self.segments)
+
+    @property
+    def specificity(self):
+        return len(self.query) + len(self.headers)
+
+    def matches(self, query, headers):
+        for key, value in self.query.items():
+            if key not in query or (value is not None and query[key] != value):
+                return False
+        for key, value in self.headers.items():
+            if key not in headers or (value is not None and headers[key] != value):
+                return False
+        return True
+
+
+class _Node:
+    __slots__ = ('children', 'wildcard', 'routes')
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard = None
+        self.routes = []
+
+
+class RouteIndex:
+    """Precompiled lookup from (method, path) to candidate routes"""
+
+    def __init__(self, routes=()):
+        self.exact = {}
+        self.trees = {}
+        self.size = 0
+        for route in routes:
+            self.add(route)
+        self.finalize()
+
+    def add(self, route):
+        self.size += 1
+        if not route.is_template:
+            self.exact.setdefault((route.method, route.path), []).append(route)
+            return
+        node = self.trees.setdefault(route.method, _Node())
+        for segment in route.segments:
+            if is_placeholder(segment):
+                if node.wildcard is None:
+                    node.wildcard = _Node()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(segment, _Node())
+        node.routes.append(route)
+
+    def finalize(self):
+        """Order candidates most specific first; ties keep insertion order"""
+        for candidates in self.exact.values():
+            candidates.sort(key=lambda r: -r.specificity)
+        stack = list(self.trees.values())
+        while stack:
+            node = stack.pop()
+            node.routes.sort(key=lambda r: -r.specificity)
+            stack.extend(node.children.values())
+            if node.wildcard is not None:
+                stack.append(node.wildcard)
+
+    def _walk(self, node, segments, index):
+        if index == len(segments):
+            yield from node.routes
+            return
+        child = node.children.get(segments[index])
+        if child is not None:
+            yield from self._walk(child, segments, index + 1)
+        if node.wildcard is not None:
+            yield from self._walk(node.wildcard, segments, index + 1)
+
+    def match(self, method, path, query, headers):
+        if len(path) > 1:
+            path = path.rstrip('/')
+        for route in self.exact.get((method, path), ()):
+            if route.matches(query, headers):
+                return route
+        root = self.trees.get(method)
+        if root is not None:
+            segments = [s for s in path.split('/') if s]
+            for route in self._walk(root, segments, 0):
+                if route.matches(query, headers):
+                    return route
+        return None
+
+
+def validate_example_response(example):
+    """Raise ValueError unless example has the shape served by MockResponse"""
+    if not isinstance(example, dict):
+        raise ValueError('example response must be a JSON object')
+    status_code = example.get('status_code', 200)
+    if not isinstance(status_code, int) or isinstance(status_code, bool) or not 100 <= status_code <= 599:
+        raise ValueError('status_code must be an integer HTTP status')
+    for key in ('headers', 'match_headers'):
+        if example.get(key) is not None and not isinstance(example[key], dict):
+            raise ValueError(f'{key} must be a JSON object')
+    if example.get('content_type') is not None and not isinstance(example['content_type'], str):
+        raise ValueError('content_type must be a string')
+    latency_ms = example.get('latency_ms')
+    if latency_ms is not None and (isinstance(latency_ms, bool) or not isinstance(latency_ms, (int, float))
+                                   or latency_ms < 0):
+        raise ValueError('latency_ms must be a non-negative number')
+    error_rate = example.get('error_rate')
+    if error_rate is not None and (isinstance(error_rate, bool) or not isinstance(error_rate, (int, float))
+                                   or not 0 <= error_rate <= 1):
+        raise ValueError('error_rate must be a number between 0 and 1')
+
+
+def routes_from_collection(collection):
+    """Routes for saved requests that carry a valid example response"""
+    routes = []
+    for request_data in collection.get('requests', []):
+        example = request_data.get('example_response')
+        if not example:
+            continue
+        try:
+            validate_example_response(example)
+        except ValueError as e:
+            print(f'Skipping example for {request_data.get("name", "request")}: {e}', file=sys.stderr)
+            continue
+        response = MockResponse(example.get('status_code', 200), example.get('headers'),
+                                example.get('body', _NO_BODY), example.get('content_type'))
+        routes.append(MockRoute(request_data.get('method'), request_data.get('url'), response,
+                                match_headers=example.get('match_headers'),
+                                latency_ms=example.get('latency_ms'),
+                                error_rate=example.get('error_rate'),
+                                source=f'request:{request_data.get("id", request_data.get("name"))}'))
+    return routes
+
+
+def routes_from_history(entries):
+    """Routes for recorded history entries (dicts from RequestHistory.to_dict()), newest first"""
+    routes = []
+    for entry in entries:
+        request_data = entry.get('request_data') or {}
+        response_data = entry.get('response_data') or {}
+        if entry.get('status_code') is None or 'error' in response_data:
+            continue
+        response = MockResponse(entry['status_code'], response_data.get('headers'),
+                                response_data.get('body', _NO_BODY), response_data.get('content_type'))
+        routes.append(MockRoute(request_data.get('method'), request_data.get('url'), response,
+                                source=f'history:{entry.get("id")}'))
+    return routes
+
+
+def load_from_database(collection_id=None, user_id=None, history=False, history_limit=1000):
+    from app import create_app, db
+    from models import Collection, RequestHistory
+
+    app = create_app()
+    routes = []
+    with app.app_context():
+        if collection_id is not None:
+            collection = db.session.get(Collection, collection_id)
+            if collection is None:
+                raise SystemExit(f'Collection {collection_id} not found')
+            routes.extend(routes_from_collection(collection.to_dict()))
+            user_id = user_id or collection.user_id
+        elif user_id is not None:
+            for collection in Collection.query.filter_by(user_id=user_id).all():
+                routes.extend(routes_from_collection(collection.to_dict()))
+        if history and user_id is not None:
+            entries = RequestHistory.query.filter_by(user_id=user_id).order_by(
+                RequestHistory.timestamp.desc()).limit(history_limit).all()
+            routes.extend(routes_from_history(entry.to_dict() for entry in entries))
+    return routes
+
+
+class MockServer:
+    def __init__(self, index, latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503, error_mode='status'):
+        self.index = index
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_mode = error_mode
+        self.error_response = MockResponse(error_status, body={'error': 'Injected fault'})
+        self.bad_request = MockResponse(400, body={'error': 'Malformed request body framing'})
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    await self.discard_body(reader, headers)
+                except ValueError:
+                    # Malformed Content-Length or chunk size: the framing is lost
+                    writer.write(self.bad_request.render(keep_alive=False))
+                    await writer.drain()
+                    break
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                payload = await self.respond(method.upper(), target, headers, keep_alive)
+                if payload is None:
+                    break
+                writer.write(payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def discard_body(self, reader, headers):
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif headers.get('content-length'):
+            await reader.readexactly(int(headers['content-length']))
+
+    async def respond(self, method, target, headers, keep_alive):
+        """Rendered response bytes, or None to drop the connection"""
+        path, _, query_string = target.partition('?')
+        query = dict(parse_qsl(query_string, keep_blank_values=True))
+        route = self.index.match(method, path, query, headers)
+
+        latency_ms = self.latency_ms
+        error_rate = self.error_rate
+        if route is not None:
+            latency_ms = route.latency_ms if route.latency_ms is not None else latency_ms
+            error_rate = route.error_rate if route.error_rate is not None else error_rate
+
+        delay = latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000.0)
+
+        if error_rate and random.random() < error_rate:
+            if self.error_mode == 'reset':
+                return None
+            return self.error_response.render(keep_alive)
+        if route is None:
+            return MockResponse(404, body={'error': f'No mock for {method} {path}'}).render(keep_alive)
+        return route.response.render(keep_alive)
+
+    def serve(self, sock):
+        """Run the event loop on an already-bound listening socket"""
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:
+            pass
+
+        async def main():
+            server = await asyncio.start_server(self.handle_connection, sock=sock, backlog=1024)
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+def run(server, host, port, workers):
+    """Serve with `workers` forked processes sharing one listening socket"""
+    sock = bind_socket(host, port)
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        server.serve(sock)
+        return
+
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=server.serve, args=(sock,), daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    def stop(signum, frame):
+        for process in processes:
+            process.terminate()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for process in processes:
+        process.join()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Serve saved and recorded responses as a mock API.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--collection-file', help='exported collection JSON file')
+    source.add_argument('--collection-id', type=int, help='collection id in the app database')
+    source.add_argument('--user-id', type=int, help="all of a user's collections in the app database")
+    parser.add_argument('--history', action='store_true', help="also serve the user's recorded history")
+    parser.add_argument('--history-limit', type=int, default=1000)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--latency-ms', type=float, default=0, help='added delay per response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='random extra delay up to this value')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--error-mode', choices=['status', 'reset'], default='status',
+                        help='fail with --error-status or by closing the connection')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.collection_file:
+        with open(args.collection_file, 'rb') as f:
+            routes = routes_from_collection(json_backend.loads(f.read()))
+    else:
+        routes = load_from_database(args.collection_id, args.user_id, args.history, args.history_limit)
+
+    index = RouteIndex(routes)
+    server = MockServer(index, args.latency_ms, args.jitter_ms, args.error_rate,
+                        args.error_status, args.error_mode)
+    print(f'Serving {index.size} mock routes on http://{args.host}:{args.port} '
+          f'with {max(1, args.workers)} worker(s)')
+    run(server, args.host, args.port, args.workers)
+
+
+if __name__ == '__main__':
+    main()
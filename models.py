@@ -1,8 +1,9 @@
 from app import db
 from datetime import datetime
+import os
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
-import json
+from json_fields import JSONField
 
 
 class User(UserMixin, db.Model):
@@ -21,6 +22,8 @@ class User(UserMixin, db.Model):
     collections = db.relationship('Collection', backref='user', lazy=True, cascade='all, delete-orphan')
     environments = db.relationship('Environment', backref='user', lazy=True, cascade='all, delete-orphan')
     request_history = db.relationship('RequestHistory', backref='user', lazy=True, cascade='all, delete-orphan')
+    uploaded_files = db.relationship('UploadedFile', backref='user', lazy=True, cascade='all, delete-orphan')
+    endpoint_rollups = db.relationship('EndpointRollup', backref='user', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
         """Hash and set the user's password"""
@@ -59,6 +62,7 @@ class Collection(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
+    policy = db.Column(db.Text)  # JSON string of default request policy (timeouts, retries, hedging)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -66,11 +70,20 @@ class Collection(db.Model):
     # Relationship with requests
     requests = db.relationship('ApiRequest', backref='collection', lazy=True, cascade='all, delete-orphan')
 
+    policy_json = JSONField('policy')
+
+    def get_policy(self):
+        return dict(self.policy_json)
+
+    def set_policy(self, policy_dict):
+        self.policy_json = policy_dict
+
     def to_dict(self):
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
+            'policy': self.get_policy(),
             'user_id': self.user_id,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
@@ -88,31 +101,47 @@ class ApiRequest(db.Model):
     body_type = db.Column(db.String(20), default='json')  # json, form, raw
     auth_type = db.Column(db.String(20))  # bearer, apikey, basic
     auth_data = db.Column(db.Text)  # JSON string for auth details
+    policy = db.Column(db.Text)  # JSON string overriding the collection's request policy
+    example_response = db.Column(db.Text)  # JSON string served by the mock server
     collection_id = db.Column(db.Integer, db.ForeignKey('collection.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Parsed views of the JSON columns, cached per instance; the getters
+    # return copies so callers can modify them without changing the row
+    headers_json = JSONField('headers')
+    auth_data_json = JSONField('auth_data')
+    policy_json = JSONField('policy')
+    example_response_json = JSONField('example_response')
+
     def get_headers(self):
-        if self.headers:
-            try:
-                return json.loads(self.headers)
-            except:
-                return {}
-        return {}
+        return dict(self.headers_json)
 
     def set_headers(self, headers_dict):
-        self.headers = json.dumps(headers_dict)
+        self.headers_json = headers_dict
 
     def get_auth_data(self):
-        if self.auth_data:
-            try:
-                return json.loads(self.auth_data)
-            except:
-                return {}
-        return {}
+        return dict(self.auth_data_json)
 
     def set_auth_data(self, auth_dict):
-        self.auth_data = json.dumps(auth_dict)
+        self.auth_data_json = auth_dict
+
+    def get_policy(self):
+        return dict(self.policy_json)
+
+    def set_policy(self, policy_dict):
+        self.policy_json = policy_dict
+
+    def get_example_response(self):
+        return dict(self.example_response_json)
+
+    def set_example_response(self, example_dict):
+        self.example_response_json = example_dict
+
+    def get_effective_policy(self):
+        """Merge the collection policy with this request's overrides"""
+        collection_policy = self.collection.get_policy() if self.collection else {}
+        return dict(collection_policy, **self.get_policy())
 
     def to_dict(self):
         return {
@@ -125,6 +154,8 @@ class ApiRequest(db.Model):
             'body_type': self.body_type,
             'auth_type': self.auth_type,
             'auth_data': self.get_auth_data(),
+            'policy': self.get_policy(),
+            'example_response': self.get_example_response(),
             'collection_id': self.collection_id,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
@@ -140,16 +171,13 @@ class Environment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    variables_json = JSONField('variables')
+
     def get_variables(self):
-        if self.variables:
-            try:
-                return json.loads(self.variables)
-            except:
-                return {}
-        return {}
+        return dict(self.variables_json)
 
     def set_variables(self, variables_dict):
-        self.variables = json.dumps(variables_dict)
+        self.variables_json = variables_dict
 
     def to_dict(self):
         return {
@@ -172,27 +200,20 @@ class RequestHistory(db.Model):
     response_time = db.Column(db.Float)  # in seconds
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
+    request_json = JSONField('request_data')
+    response_json = JSONField('response_data')
+
     def get_request_data(self):
-        if self.request_data:
-            try:
-                return json.loads(self.request_data)
-            except:
-                return {}
-        return {}
+        return dict(self.request_json)
 
     def set_request_data(self, request_dict):
-        self.request_data = json.dumps(request_dict)
+        self.request_json = request_dict
 
     def get_response_data(self):
-        if self.response_data:
-            try:
-                return json.loads(self.response_data)
-            except:
-                return {}
-        return {}
+        return dict(self.response_json)
 
     def set_response_data(self, response_dict):
-        self.response_data = json.dumps(response_dict)
+        self.response_json = response_dict
 
     def to_dict(self):
         return {
@@ -203,4 +224,59 @@ class RequestHistory(db.Model):
             'status_code': self.status_code,
             'response_time': self.response_time,
             'user_id': self.user_id
-        }
\ No newline at end of file
+        }
+
+
+class UploadedFile(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(200))
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    sha256 = db.Column(db.String(64))
+    stored_name = db.Column(db.String(64), nullable=False)  # file name inside UPLOAD_FOLDER
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_file_info(self, upload_folder):
+        """Description of the stored file for ApiClient"""
+        return {
+            'path': os.path.join(upload_folder, self.stored_name),
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.size
+        }
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.size,
+            'sha256': self.sha256,
+            'reference': f'@file:{self.id}',
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class EndpointRollup(db.Model):
+    """Aggregated history for one endpoint over one time bucket"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'method', 'url_template', 'resolution', 'bucket_start',
+                            name='uq_endpoint_rollup_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    method = db.Column(db.String(10), nullable=False)
+    url_template = db.Column(db.Text, nullable=False)
+    resolution = db.Column(db.String(10), nullable=False)  # hour, day
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    total_time = db.Column(db.Float, nullable=False, default=0.0)  # in seconds
+    min_time = db.Column(db.Float)
+    max_time = db.Column(db.Float)
+    total_size = db.Column(db.BigInteger, nullable=False, default=0)
+    sketch = db.Column(db.Text)  # JSON string of the latency sketch
+
+    sketch_json = JSONField('sketch')
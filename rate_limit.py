@@ -0,0 +1,219 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a limit with the 'reject' policy cannot admit a request"""
+
+    def __init__(self, scope, key, reason):
+        super().__init__(f'{reason} for {scope} {key}')
+        self.scope = scope
+        self.key = key
+        self.reason = reason
+
+
+class LimitRule:
+    """Configuration for one host or user limit.
+
+    rate/burst configure a token bucket (requests per second, bucket size);
+    max_in_flight caps concurrent requests. policy is 'queue' (wait up to
+    queue_timeout seconds) or 'reject' (fail immediately).
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None, policy='queue', queue_timeout=30.0):
+        if policy not in ('queue', 'reject'):
+            raise ValueError(f'Unknown rate limit policy: {policy}')
+        self.rate = rate
+        self.burst = burst or (max(1, int(rate)) if rate else None)
+        self.max_in_flight = max_in_flight
+        self.policy = policy
+        self.queue_timeout = queue_timeout
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            rate=data.get('rate'),
+            burst=data.get('burst'),
+            max_in_flight=data.get('max_in_flight'),
+            policy=data.get('policy', 'queue'),
+            queue_timeout=data.get('queue_timeout', 30.0),
+        )
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token; return 0 on success or the seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class Limit:
+    """Runtime state for one limited key: token bucket, in-flight slots and counters"""
+
+    def __init__(self, scope, key, rule):
+        self.scope = scope
+        self.key = key
+        self.rule = rule
+        self.bucket = TokenBucket(rule.rate, rule.burst) if rule.rate else None
+        self.slots = threading.BoundedSemaphore(rule.max_in_flight) if rule.max_in_flight else None
+        self.in_flight = 0
+        self.admitted = 0
+        self.throttled = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def acquire(self, deadline):
+        """Admit one request, waiting until deadline under the 'queue' policy"""
+        reject = self.rule.policy == 'reject'
+        throttled = False
+
+        if self.slots is not None:
+            if not self.slots.acquire(blocking=False):
+                throttled = True
+                remaining = deadline - time.monotonic()
+                if reject or remaining <= 0 or not self.slots.acquire(timeout=remaining):
+                    self._count('rejected')
+                    raise RateLimitExceeded(self.scope, self.key, 'Too many requests in flight')
+
+        if self.bucket is not None:
+            while True:
+                wait = self.bucket.try_acquire()
+                if not wait:
+                    break
+                throttled = True
+                if reject or time.monotonic() + wait > deadline:
+                    if self.slots is not None:
+                        self.slots.release()
+                    self._count('rejected')
+                    raise RateLimitExceeded(self.scope, self.key, 'Rate limit exceeded')
+                time.sleep(wait)
+
+        with self._lock:
+            self.admitted += 1
+            self.in_flight += 1
+            if throttled:
+                self.throttled += 1
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        if self.slots is not None:
+            self.slots.release()
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'admitted': self.admitted,
+            'throttled': self.throttled,
+            'rejected': self.rejected,
+        }
+
+
+class OutboundLimiter:
+    """Per-host and per-user limits shared by every ApiClient in the process.
+
+    Rules are keyed by hostname or user id; the key '*' applies a separate
+    limit to every host or user without an explicit rule.
+    """
+
+    def __init__(self):
+        self.host_rules = {}
+        self.user_rules = {}
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def configure(self, hosts=None, users=None):
+        """Replace the rule set; accepts LimitRule instances or plain dicts"""
+        def build(rules):
+            return {
+                str(key): rule if isinstance(rule, LimitRule) else LimitRule.from_dict(rule)
+                for key, rule in (rules or {}).items()
+            }
+
+        with self._lock:
+            self.host_rules = build(hosts)
+            self.user_rules = build(users)
+            self._limits = {}
+
+    @property
+    def enabled(self):
+        return bool(self.host_rules or self.user_rules)
+
+    def _limit(self, scope, key):
+        rules = self.host_rules if scope == 'host' else self.user_rules
+        key = str(key)
+        rule = rules.get(key) or rules.get('*')
+        if rule is None:
+            return None
+        with self._lock:
+            limit = self._limits.get((scope, key))
+            if limit is None:
+                limit = self._limits[(scope, key)] = Limit(scope, key, rule)
+        return limit
+
+    @contextmanager
+    def acquire(self, host, user_id=None):
+        """Hold a user slot then a host slot for the duration of one request.
+
+        Yields a dict describing how long the request waited and the current
+        counters for each applied limit.
+        """
+        info = {'queued_seconds': 0.0, 'throttled': False}
+        if not self.enabled:
+            yield info
+            return
+
+        limits = []
+        if user_id is not None:
+            limits.append(self._limit('user', user_id))
+        if host:
+            limits.append(self._limit('host', host.lower()))
+        limits = [limit for limit in limits if limit is not None]
+
+        start = time.monotonic()
+        acquired = []
+        try:
+            for limit in limits:
+                limit.acquire(start + limit.rule.queue_timeout)
+                acquired.append(limit)
+        except RateLimitExceeded:
+            for limit in reversed(acquired):
+                limit.release()
+            raise
+
+        info['queued_seconds'] = time.monotonic() - start
+        info['throttled'] = info['queued_seconds'] > 0.001
+        try:
+            yield info
+        finally:
+            for limit in reversed(acquired):
+                limit.release()
+            for limit in acquired:
+                info[limit.scope] = dict(limit.stats(), key=limit.key)
+
+    def stats(self):
+        with self._lock:
+            limits = list(self._limits.values())
+        return {f'{limit.scope}:{limit.key}': limit.stats() for limit in limits}
+
+
+# Process-wide limiter used by ApiClient unless one is passed explicitly
+default_limiter = OutboundLimiter()
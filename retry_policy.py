@@ -0,0 +1,182 @@
+import random
+import threading
+from collections import deque
+
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'}
+
+# Failure kinds reported by ApiClient.error_kind()
+ERROR_KINDS = {'timeout', 'connection', 'throttled', 'request'}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# Option name -> (check, description of valid values)
+_CHECKS = {
+    'connect_timeout': (lambda v: _is_number(v) and v > 0, 'a positive number'),
+    'read_timeout': (lambda v: _is_number(v) and v > 0, 'a positive number'),
+    'max_retries': (lambda v: _is_int(v) and v >= 0, 'a non-negative integer'),
+    'backoff_base': (lambda v: _is_number(v) and v >= 0, 'a non-negative number'),
+    'backoff_max': (lambda v: _is_number(v) and v >= 0, 'a non-negative number'),
+    'jitter': (lambda v: isinstance(v, bool), 'true or false'),
+    'retry_statuses': (lambda v: isinstance(v, list) and all(_is_int(s) and 100 <= s <= 599 for s in v),
+                       'a list of HTTP status codes'),
+    'retry_errors': (lambda v: isinstance(v, list) and all(e in ERROR_KINDS for e in v),
+                     f'a list of {", ".join(sorted(ERROR_KINDS))}'),
+    'retry_non_idempotent': (lambda v: isinstance(v, bool), 'true or false'),
+    'retry_budget_ratio': (lambda v: _is_number(v) and v >= 0, 'a non-negative number'),
+    'retry_budget_min': (lambda v: _is_number(v) and v >= 0, 'a non-negative number'),
+    'hedge': (lambda v: isinstance(v, bool), 'true or false'),
+    'hedge_delay': (lambda v: v is None or (_is_number(v) and v >= 0), 'null or a non-negative number'),
+    'hedge_min_samples': (lambda v: _is_int(v) and v >= 1, 'a positive integer'),
+}
+
+
+class RequestPolicy:
+    """Timeouts, retries and hedging for one outbound request.
+
+    Policies are stored as JSON on collections and requests; a request's
+    policy overrides its collection's, which overrides these defaults.
+    """
+
+    DEFAULTS = {
+        'connect_timeout': 10.0,
+        'read_timeout': 30.0,
+        'max_retries': 0,
+        'backoff_base': 0.5,
+        'backoff_max': 10.0,
+        'jitter': True,
+        'retry_statuses': [502, 503, 504],
+        'retry_errors': ['timeout', 'connection'],
+        'retry_non_idempotent': False,
+        'retry_budget_ratio': 0.2,
+        'retry_budget_min': 10,
+        'hedge': False,
+        'hedge_delay': None,  # seconds; None uses the host's observed p95
+        'hedge_min_samples': 20,
+    }
+
+    def __init__(self, **options):
+        unknown = set(options) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f'Unknown policy options: {", ".join(sorted(unknown))}')
+        for name, default in self.DEFAULTS.items():
+            value = options.get(name, default)
+            check, expected = _CHECKS[name]
+            if not check(value):
+                raise ValueError(f'{name} must be {expected}, got {value!r}')
+            setattr(self, name, value)
+
+    @classmethod
+    def merged(cls, *layers):
+        """Build a policy from dicts applied in order, later ones winning"""
+        options = {}
+        for layer in layers:
+            if layer is None:
+                continue
+            if not isinstance(layer, dict):
+                raise ValueError('a policy must be a JSON object')
+            options.update(layer)
+        return cls(**options)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def can_retry(self, method):
+        return self.retry_non_idempotent or method.upper() in IDEMPOTENT_METHODS
+
+    def can_hedge(self, method):
+        return self.hedge and method.upper() in IDEMPOTENT_METHODS
+
+    def backoff(self, retry_number, retry_after=None):
+        """Exponential backoff (full jitter) before retry number retry_number (1-based)"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (retry_number - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent traffic so retries cannot snowball.
+
+    Each request deposits `ratio` tokens (up to `minimum`) and each retry or
+    hedge withdraws one, so after an initial allowance of `minimum` retries,
+    sustained retries are limited to that fraction of traffic.
+    """
+
+    def __init__(self, ratio, minimum):
+        self.ratio = ratio
+        self.capacity = float(minimum)
+        self.tokens = float(minimum)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class LatencyTracker:
+    """Recent successful response times per host, for hedge delays"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, host, seconds):
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, host, pct, min_samples=1):
+        with self._lock:
+            samples = sorted(self._samples.get(host, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class PolicyState:
+    """Process-wide retry budgets and latency history, keyed by host.
+
+    Requests to a host that use the same budget settings share one budget;
+    policies with different settings each get their own.
+    """
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def budget(self, host, policy):
+        key = (host, policy.retry_budget_ratio, policy.retry_budget_min)
+        with self._lock:
+            budget = self._budgets.get(key)
+            if budget is None:
+                budget = self._budgets[key] = RetryBudget(policy.retry_budget_ratio, policy.retry_budget_min)
+        return budget
+
+
+default_policy_state = PolicyState()
@@ -0,0 +1,341 @@
+import logging
+import math
+import re
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from sqlalchemy import case, inspect, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app import db
+from models import EndpointRollup
+
+
+RESOLUTIONS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+_ID_SEGMENT = re.compile(
+    r'^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})$'
+)
+
+
+class LatencySketch:
+    """Mergeable quantile sketch with bounded relative error.
+
+    Values go into logarithmic bins (as in DDSketch), so any quantile is within
+    RELATIVE_ACCURACY of the true value, and two sketches merge by adding
+    their bin counts.
+    """
+
+    RELATIVE_ACCURACY = 0.01
+    MIN_VALUE = 1e-6
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self, bins=None, zero_count=0):
+        self.bins = bins or {}
+        self.zero_count = zero_count
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls({int(k): v for k, v in (data.get('bins') or {}).items()}, data.get('zero', 0))
+
+    def to_dict(self):
+        return {'bins': {str(k): v for k, v in self.bins.items()}, 'zero': self.zero_count}
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value, count=1):
+        if value is None:
+            return
+        if value <= self.MIN_VALUE:
+            self.zero_count += count
+            return
+        index = int(math.ceil(math.log(value) / self.LOG_GAMMA))
+        self.bins[index] = self.bins.get(index, 0) + count
+
+    def merge(self, other):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        return self
+
+    def quantile(self, q):
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return 2 * self.GAMMA ** index / (self.GAMMA + 1)
+        return 2 * self.GAMMA ** max(self.bins) / (self.GAMMA + 1)
+
+
+def normalize_url_template(url):
+    """Group URLs by endpoint: drop the query and replace id-like path
+    segments (numbers, UUIDs, long hex) with {id}; {{variables}} are kept"""
+    url = (url or '').strip()
+    base, path = '', url
+    if '://' in url:
+        parts = urlsplit(url)
+        base, path = f'{parts.scheme}://{parts.netloc}', parts.path
+    path = path.split('?', 1)[0].split('#', 1)[0]
+    segments = ['{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/')]
+    return base + '/'.join(segments)
+
+
+def bucket_start(timestamp, resolution):
+    if resolution == 'day':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _apply(user_id, method, url_template, resolution, start, response_time, is_error, size):
+    """Fold one observation into a bucket row.
+
+    The counters are bumped with a single UPDATE first, which takes the write
+    lock (SQLite) or row lock (Postgres) before the sketch is read and merged,
+    so concurrent writers cannot lose updates.
+    """
+    key = (
+        (EndpointRollup.user_id == user_id)
+        & (EndpointRollup.method == method)
+        & (EndpointRollup.url_template == url_template)
+        & (EndpointRollup.resolution == resolution)
+        & (EndpointRollup.bucket_start == start)
+    )
+    values = {
+        'count': EndpointRollup.count + 1,
+        'error_count': EndpointRollup.error_count + (1 if is_error else 0),
+        'total_size': EndpointRollup.total_size + (size or 0),
+    }
+    if response_time is not None:
+        values.update({
+            'total_time': EndpointRollup.total_time + response_time,
+            'min_time': case(
+                ((EndpointRollup.min_time.is_(None)) | (EndpointRollup.min_time > response_time), response_time),
+                else_=EndpointRollup.min_time),
+            'max_time': case(
+                ((EndpointRollup.max_time.is_(None)) | (EndpointRollup.max_time < response_time), response_time),
+                else_=EndpointRollup.max_time),
+        })
+    result = db.session.execute(
+        update(EndpointRollup).where(key).values(**values).execution_options(synchronize_session=False)
+    )
+
+    if result.rowcount:
+        rollup = db.session.execute(
+            db.select(EndpointRollup).where(key).execution_options(populate_existing=True)
+        ).scalar_one()
+        sketch = LatencySketch.from_dict(rollup.sketch_json)
+        sketch.add(response_time)
+        rollup.sketch_json = sketch.to_dict()
+        return
+
+    sketch = LatencySketch()
+    sketch.add(response_time)
+    rollup = EndpointRollup(
+        user_id=user_id,
+        method=method,
+        url_template=url_template,
+        resolution=resolution,
+        bucket_start=start,
+        count=1,
+        error_count=1 if is_error else 0,
+        total_time=response_time or 0.0,
+        min_time=response_time,
+        max_time=response_time,
+        total_size=size or 0,
+    )
+    rollup.sketch_json = sketch.to_dict()
+    db.session.add(rollup)
+
+
+def observation(entry):
+    """The values of a RequestHistory row that rollups aggregate"""
+    request_data = entry.get_request_data()
+    response_data = entry.get_response_data()
+    method = (request_data.get('method') or 'GET').upper()
+    url_template = normalize_url_template(request_data.get('url'))
+    is_error = 'error' in response_data or (entry.status_code or 0) >= 400
+    return (entry.user_id, method, url_template, entry.timestamp, entry.response_time, is_error,
+            response_data.get('size'))
+
+
+def apply_observation(user_id, method, url_template, timestamp, response_time, is_error, size):
+    """Add one observation to its endpoint's hour and day rollups (without committing)"""
+    for resolution in RESOLUTIONS:
+        _apply(user_id, method, url_template, resolution, bucket_start(timestamp, resolution),
+               response_time, is_error, size)
+
+
+def record_history_entry(entry):
+    """Add a RequestHistory row to its endpoint's rollups (without committing)"""
+    apply_observation(*observation(entry))
+
+
+def record(entry):
+    """Update rollups for a committed history row.
+
+    The row is read first and that read transaction ended before writing: on
+    SQLite in WAL mode a read transaction cannot be upgraded to a write once
+    another connection has committed, and fails at once rather than waiting
+    out the busy timeout.
+
+    Two writers creating the same new bucket collide on the unique key; the
+    loser retries once, then finds the row and updates it. Any database error
+    is rolled back and logged rather than raised, so it never fails the
+    request that was recorded.
+    """
+    log = logging.getLogger(__name__)
+    history_id = inspect(entry).identity[0]  # without reloading the expired row
+    try:
+        values = observation(entry)
+        db.session.rollback()
+    except SQLAlchemyError:
+        db.session.rollback()
+        log.exception('Could not update rollups for history %s', history_id)
+        return
+
+    for attempt in range(2):
+        try:
+            apply_observation(*values)
+            db.session.commit()
+            return
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                log.warning('Could not update rollups for history %s', history_id)
+        except SQLAlchemyError:
+            db.session.rollback()
+            log.exception('Could not update rollups for history %s', history_id)
+            return
+
+
+def rebuild(user_id=None):
+    """Recompute rollups from history (one-off backfill)"""
+    from models import RequestHistory
+
+    delete = db.delete(EndpointRollup)
+    query = RequestHistory.query.order_by(RequestHistory.id)
+    if user_id is not None:
+        delete = delete.where(EndpointRollup.user_id == user_id)
+        query = query.filter_by(user_id=user_id)
+    db.session.execute(delete)
+
+    count = 0
+    for entry in query.yield_per(500):
+        record_history_entry(entry)
+        count += 1
+    db.session.commit()
+    return count
+
+
+def plan_buckets(start, end):
+    """Split [start, end) into (resolution, from, to) ranges so that whole days
+    use day buckets and only the partial days at the edges use hour buckets.
+
+    The number of rows read is at most 48 hour rows plus one per day, however
+    much history the range covers.
+    """
+    start = bucket_start(start, 'hour')
+    end_hour = bucket_start(end, 'hour')
+    end = end_hour if end_hour == end else end_hour + RESOLUTIONS['hour']
+
+    first_day = bucket_start(start, 'day')
+    if first_day < start:
+        first_day += RESOLUTIONS['day']
+    last_day = bucket_start(end, 'day')
+    if first_day >= last_day:
+        return [('hour', start, end)]
+
+    plan = [('day', first_day, last_day)]
+    if start < first_day:
+        plan.append(('hour', start, first_day))
+    if last_day < end:
+        plan.append(('hour', last_day, end))
+    return plan
+
+
+def _empty_stats():
+    return {'count': 0, 'error_count': 0, 'total_time': 0.0, 'min_time': None, 'max_time': None,
+            'total_size': 0, 'sketch': LatencySketch()}
+
+
+def _fold(stats, rollup):
+    stats['count'] += rollup.count
+    stats['error_count'] += rollup.error_count
+    stats['total_time'] += rollup.total_time or 0.0
+    stats['total_size'] += rollup.total_size or 0
+    if rollup.min_time is not None:
+        stats['min_time'] = rollup.min_time if stats['min_time'] is None else min(stats['min_time'], rollup.min_time)
+    if rollup.max_time is not None:
+        stats['max_time'] = rollup.max_time if stats['max_time'] is None else max(stats['max_time'], rollup.max_time)
+    stats['sketch'].merge(LatencySketch.from_dict(rollup.sketch_json))
+
+
+def _summarize(stats):
+    count = stats['count']
+    sketch = stats['sketch']
+    return {
+        'count': count,
+        'error_count': stats['error_count'],
+        'error_rate': stats['error_count'] / count if count else 0.0,
+        'avg_time': stats['total_time'] / count if count else None,
+        'min_time': stats['min_time'],
+        'max_time': stats['max_time'],
+        'p50': sketch.quantile(0.5),
+        'p95': sketch.quantile(0.95),
+        'p99': sketch.quantile(0.99),
+        'avg_size': stats['total_size'] / count if count else None,
+    }
+
+
+def _rollup_query(user_id, resolution, start, end, method=None, url_template=None):
+    query = EndpointRollup.query.filter(
+        EndpointRollup.user_id == user_id,
+        EndpointRollup.resolution == resolution,
+        EndpointRollup.bucket_start >= start,
+        EndpointRollup.bucket_start < end,
+    )
+    if method:
+        query = query.filter(EndpointRollup.method == method.upper())
+    if url_template:
+        query = query.filter(EndpointRollup.url_template == url_template)
+    return query
+
+
+def summarize_range(user_id, start, end, method=None, url_template=None, interval=None):
+    """Per-endpoint stats for [start, end), optionally with a time series at
+    the given interval ('hour' or 'day')"""
+    endpoints = {}
+    for resolution, range_start, range_end in plan_buckets(start, end):
+        for rollup in _rollup_query(user_id, resolution, range_start, range_end, method, url_template):
+            key = (rollup.method, rollup.url_template)
+            _fold(endpoints.setdefault(key, _empty_stats()), rollup)
+
+    series = {}
+    if interval in RESOLUTIONS:
+        query = _rollup_query(user_id, interval, bucket_start(start, interval), end, method, url_template)
+        for rollup in query.order_by(EndpointRollup.bucket_start):
+            stats = _empty_stats()
+            _fold(stats, rollup)
+            point = dict(_summarize(stats), bucket_start=rollup.bucket_start.isoformat())
+            series.setdefault((rollup.method, rollup.url_template), []).append(point)
+
+    results = []
+    for (endpoint_method, endpoint_url), stats in sorted(endpoints.items(), key=lambda item: -item[1]['count']):
+        summary = dict(_summarize(stats), method=endpoint_method, url_template=endpoint_url)
+        if interval in RESOLUTIONS:
+            summary['series'] = series.get((endpoint_method, endpoint_url), [])
+        results.append(summary)
+    return results
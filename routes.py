@@ -1,35 +1,54 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, session
+from flask import render_template, request, redirect, url_for, flash, jsonify, session, current_app
 from flask_login import current_user
-from app import app, db
-from models import Collection, ApiRequest, Environment, RequestHistory, User
+from app import db
+from models import Collection, ApiRequest, Environment, RequestHistory, User, UploadedFile, EndpointRollup
 from api_client import ApiClient
 from auth import require_login, login_route, signup_route, logout_route
+from retry_policy import RequestPolicy
+import rollups
+from sqlite_tuning import history_writer
+from uploads import file_references, guess_content_type, store_stream
+from mock_server import validate_example_response
+from datetime import datetime, timedelta, timezone
 import json
+import os
 
 # Authentication routes
-@app.route('/login', methods=['GET', 'POST'])
 def login():
     return login_route()
 
-@app.route('/signup', methods=['GET', 'POST'])  
 def signup():
     return signup_route()
 
-@app.route('/logout')
 def logout():
     return logout_route()
 
-@app.route('/landing')
 def landing():
     return render_template('landing.html')
 
 # Make session permanent
-@app.before_request
 def make_session_permanent():
     session.permanent = True
 
 
-@app.route('/')
+def parse_json_object(raw):
+    """Parse form JSON that must be an object; empty input gives {}"""
+    value = json.loads(raw) if raw else {}
+    if not isinstance(value, dict):
+        raise ValueError('expected a JSON object')
+    return value
+
+
+def resolve_files(body_type, body, user_id):
+    """Map file ids referenced by a body to the user's stored files"""
+    file_ids = file_references(body_type, body)
+    if not file_ids:
+        return {}
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    uploaded = UploadedFile.query.filter(UploadedFile.id.in_(file_ids), UploadedFile.user_id == user_id).all()
+    return {f.id: f.get_file_info(upload_folder) for f in uploaded}
+
+
 def index():
     """Main API testing interface - Landing page for logged out users, home page for logged in"""
     if current_user.is_authenticated:
@@ -46,7 +65,6 @@ def index():
         return render_template('landing.html')
 
 
-@app.route('/collections')
 @require_login
 def collections():
     """Collections management page"""
@@ -54,7 +72,6 @@ def collections():
     return render_template('collections.html', collections=collections)
 
 
-@app.route('/environments')
 @require_login
 def environments():
     """Environment variables management page"""
@@ -62,7 +79,6 @@ def environments():
     return render_template('environments.html', environments=environments)
 
 
-@app.route('/history')
 @require_login
 def history():
     """Request history page"""
@@ -70,7 +86,6 @@ def history():
     return render_template('history.html', history=history)
 
 
-@app.route('/send_request', methods=['POST'])
 @require_login
 def send_request():
     """Send API request and return response"""
@@ -83,24 +98,50 @@ def send_request():
         body_type = request.form.get('body_type', 'json')
         auth_type = request.form.get('auth_type', '')
         auth_data_raw = request.form.get('auth_data', '{}')
+        policy_raw = request.form.get('policy', '{}')
+        request_id = request.form.get('request_id')
 
         # Parse headers and auth data
         try:
-            headers = json.loads(headers_raw) if headers_raw else {}
-        except json.JSONDecodeError:
+            headers = parse_json_object(headers_raw)
+        except ValueError:
             headers = {}
 
         try:
-            auth_data = json.loads(auth_data_raw) if auth_data_raw else {}
-        except json.JSONDecodeError:
+            auth_data = parse_json_object(auth_data_raw)
+        except ValueError:
             auth_data = {}
 
+        # Resolve the request policy: saved collection/request policy, then form overrides
+        saved_policy = {}
+        if request_id:
+            if not request_id.isdigit():
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid request_id: {request_id}'
+                }), 400
+            saved_request = db.session.query(ApiRequest).join(Collection).filter(
+                ApiRequest.id == int(request_id),
+                Collection.user_id == current_user.id
+            ).first()
+            if saved_request:
+                saved_policy = saved_request.get_effective_policy()
+
+        try:
+            policy_overrides = json.loads(policy_raw) if policy_raw else {}
+            policy = RequestPolicy.merged(saved_policy, policy_overrides)
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid request policy: {str(e)}'
+            }), 400
+
         # Get active environment for current user
         active_env = Environment.query.filter_by(user_id=current_user.id, is_active=True).first()
         environment_vars = active_env.get_variables() if active_env else {}
 
         # Send request
-        client = ApiClient()
+        client = ApiClient(transport=current_app.config['HTTP_TRANSPORT'])
         response_data = client.send_request(
             method=method,
             url=url,
@@ -109,7 +150,11 @@ def send_request():
             body_type=body_type,
             auth_type=auth_type,
             auth_data=auth_data,
-            environment_vars=environment_vars
+            environment_vars=environment_vars,
+            passthrough=current_app.config['JSON_PASSTHROUGH'],
+            user_id=current_user.id,
+            policy=policy,
+            files=resolve_files(body_type, body, current_user.id)
         )
 
         # Save to history
@@ -121,19 +166,25 @@ def send_request():
             'body': body,
             'body_type': body_type,
             'auth_type': auth_type,
-            'auth_data': auth_data
+            'auth_data': auth_data,
+            'policy': policy.to_dict()
         })
         
         if response_data['success']:
             history_entry.set_response_data(response_data)
             history_entry.status_code = response_data['status_code']
         else:
-            history_entry.set_response_data({'error': response_data.get('error', 'Unknown error')})
+            history_entry.set_response_data({
+                'error': response_data.get('error', 'Unknown error'),
+                'attempts': response_data.get('attempts', [])
+            })
             
         history_entry.response_time = response_data.get('response_time', 0)
         
-        db.session.add(history_entry)
-        db.session.commit()
+        with history_writer():
+            db.session.add(history_entry)
+            db.session.commit()
+            rollups.record(history_entry)
 
         return jsonify(response_data)
 
@@ -144,7 +195,6 @@ def send_request():
         }), 500
 
 
-@app.route('/save_request', methods=['POST'])
 @require_login
 def save_request():
     """Save request to collection"""
@@ -157,19 +207,36 @@ def save_request():
         body_type = request.form.get('body_type', 'json')
         auth_type = request.form.get('auth_type', '')
         auth_data_raw = request.form.get('auth_data', '{}')
+        policy_raw = request.form.get('policy', '{}')
+        example_response_raw = request.form.get('example_response', '{}')
         collection_id = request.form.get('collection_id')
 
         # Parse JSON data
         try:
-            headers = json.loads(headers_raw) if headers_raw else {}
-        except json.JSONDecodeError:
+            headers = parse_json_object(headers_raw)
+        except ValueError:
             headers = {}
 
         try:
-            auth_data = json.loads(auth_data_raw) if auth_data_raw else {}
-        except json.JSONDecodeError:
+            auth_data = parse_json_object(auth_data_raw)
+        except ValueError:
             auth_data = {}
 
+        try:
+            policy = json.loads(policy_raw) if policy_raw else {}
+            RequestPolicy.merged(policy)
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            flash(f'Invalid request policy: {str(e)}', 'error')
+            return redirect(url_for('index'))
+
+        try:
+            example_response = json.loads(example_response_raw) if example_response_raw else {}
+            if example_response:
+                validate_example_response(example_response)
+        except ValueError as e:
+            flash(f'Invalid example response: {str(e)}', 'error')
+            return redirect(url_for('index'))
+
         # Verify collection belongs to user if specified
         if collection_id:
             collection = Collection.query.filter_by(id=int(collection_id), user_id=current_user.id).first()
@@ -190,6 +257,8 @@ def save_request():
         
         api_request.set_headers(headers)
         api_request.set_auth_data(auth_data)
+        api_request.set_policy(policy)
+        api_request.set_example_response(example_response)
 
         db.session.add(api_request)
         db.session.commit()
@@ -202,18 +271,26 @@ def save_request():
         return redirect(url_for('index'))
 
 
-@app.route('/create_collection', methods=['POST'])
 @require_login
 def create_collection():
     """Create new collection"""
     name = request.form.get('name', '')
     description = request.form.get('description', '')
+    policy_raw = request.form.get('policy', '{}')
 
     if not name:
         flash('Collection name is required', 'error')
         return redirect(url_for('collections'))
 
+    try:
+        policy = json.loads(policy_raw) if policy_raw else {}
+        RequestPolicy.merged(policy)
+    except (json.JSONDecodeError, TypeError, ValueError) as e:
+        flash(f'Invalid request policy: {str(e)}', 'error')
+        return redirect(url_for('collections'))
+
     collection = Collection(name=name, description=description, user_id=current_user.id)
+    collection.set_policy(policy)
     db.session.add(collection)
     db.session.commit()
 
@@ -221,7 +298,6 @@ def create_collection():
     return redirect(url_for('collections'))
 
 
-@app.route('/delete_collection/<int:collection_id>', methods=['POST'])
 @require_login
 def delete_collection(collection_id):
     """Delete collection"""
@@ -233,7 +309,6 @@ def delete_collection(collection_id):
     return redirect(url_for('collections'))
 
 
-@app.route('/create_environment', methods=['POST'])
 @require_login
 def create_environment():
     """Create new environment"""
@@ -245,9 +320,9 @@ def create_environment():
         return redirect(url_for('environments'))
 
     try:
-        variables = json.loads(variables_raw) if variables_raw else {}
-    except json.JSONDecodeError:
-        flash('Invalid JSON format for variables', 'error')
+        variables = parse_json_object(variables_raw)
+    except ValueError:
+        flash('Variables must be a JSON object', 'error')
         return redirect(url_for('environments'))
 
     environment = Environment(name=name, user_id=current_user.id)
@@ -260,7 +335,6 @@ def create_environment():
     return redirect(url_for('environments'))
 
 
-@app.route('/activate_environment/<int:env_id>', methods=['POST'])
 @require_login
 def activate_environment(env_id):
     """Activate environment"""
@@ -277,7 +351,6 @@ def activate_environment(env_id):
     return redirect(url_for('environments'))
 
 
-@app.route('/delete_environment/<int:env_id>', methods=['POST'])
 @require_login
 def delete_environment(env_id):
     """Delete environment"""
@@ -289,7 +362,6 @@ def delete_environment(env_id):
     return redirect(url_for('environments'))
 
 
-@app.route('/load_request/<int:request_id>')
 @require_login
 def load_request(request_id):
     """Load saved request"""
@@ -301,7 +373,6 @@ def load_request(request_id):
     return jsonify(api_request.to_dict())
 
 
-@app.route('/export_collection/<int:collection_id>')
 @require_login
 def export_collection(collection_id):
     """Export collection as JSON"""
@@ -309,7 +380,6 @@ def export_collection(collection_id):
     return jsonify(collection.to_dict())
 
 
-@app.route('/import_collection', methods=['POST'])
 @require_login
 def import_collection():
     """Import collection from JSON"""
@@ -326,6 +396,9 @@ def import_collection():
             description=import_data.get('description', ''),
             user_id=current_user.id
         )
+        collection_policy = import_data.get('policy') or {}
+        RequestPolicy.merged(collection_policy)
+        collection.set_policy(collection_policy)
         db.session.add(collection)
         db.session.flush()  # Get ID
 
@@ -343,6 +416,13 @@ def import_collection():
             
             api_request.set_headers(req_data.get('headers', {}))
             api_request.set_auth_data(req_data.get('auth_data', {}))
+            request_policy = req_data.get('policy') or {}
+            RequestPolicy.merged(collection_policy, request_policy)
+            api_request.set_policy(request_policy)
+            example_response = req_data.get('example_response') or {}
+            if example_response:
+                validate_example_response(example_response)
+            api_request.set_example_response(example_response)
             
             db.session.add(api_request)
 
@@ -355,11 +435,138 @@ def import_collection():
     return redirect(url_for('collections'))
 
 
-@app.route('/clear_history', methods=['POST'])
+@require_login
+def upload_file():
+    """Store an uploaded file for binary and multipart request bodies.
+
+    Accepts the file as the raw request body (filename in the query string),
+    which is streamed to disk without being buffered, or as a multipart
+    "file" field.
+    """
+    try:
+        # Only multipart bodies are parsed; touching request.files for any
+        # other content type would consume the raw stream
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if not upload:
+                return jsonify({'success': False, 'error': 'No "file" field in upload'}), 400
+            filename = upload.filename
+            content_type = upload.mimetype
+            stream = upload.stream
+        else:
+            filename = request.args.get('filename', 'upload.bin')
+            # curl --data-binary sends form-urlencoded by default; it says nothing about the file
+            content_type = request.content_type if request.mimetype != 'application/x-www-form-urlencoded' else None
+            stream = request.stream
+
+        stored_name, size, sha256 = store_stream(stream, current_app.config['UPLOAD_FOLDER'])
+        uploaded = UploadedFile(
+            filename=os.path.basename(filename) or 'upload.bin',
+            content_type=content_type or guess_content_type(filename),
+            size=size,
+            sha256=sha256,
+            stored_name=stored_name,
+            user_id=current_user.id
+        )
+        db.session.add(uploaded)
+        db.session.commit()
+        return jsonify(uploaded.to_dict())
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Upload error: {str(e)}'
+        }), 500
+
+
+@require_login
+def list_files():
+    """List the user's uploaded files"""
+    files = UploadedFile.query.filter_by(user_id=current_user.id).order_by(UploadedFile.created_at.desc()).all()
+    return jsonify([f.to_dict() for f in files])
+
+
+@require_login
+def delete_file(file_id):
+    """Delete an uploaded file"""
+    uploaded = UploadedFile.query.filter_by(id=file_id, user_id=current_user.id).first_or_404()
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], uploaded.stored_name)
+    db.session.delete(uploaded)
+    db.session.commit()
+    if os.path.exists(path):
+        os.remove(path)
+    return jsonify({'success': True})
+
+
 @require_login
 def clear_history():
     """Clear request history"""
     RequestHistory.query.filter_by(user_id=current_user.id).delete()
+    EndpointRollup.query.filter_by(user_id=current_user.id).delete()
     db.session.commit()
     flash('History cleared successfully!', 'success')
     return redirect(url_for('history'))
+
+
+def parse_utc(value):
+    """ISO 8601 timestamp as naive UTC, like the history timestamps"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+@require_login
+def analytics():
+    """Per-endpoint latency, error rate and size over a time range, served
+    from the rollup tables"""
+    try:
+        end = parse_utc(request.args['end']) if request.args.get('end') else datetime.utcnow()
+        start = parse_utc(request.args['start']) if request.args.get('start') else end - timedelta(days=1)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid time range: {str(e)}'}), 400
+
+    interval = request.args.get('interval')
+    if interval and interval not in rollups.RESOLUTIONS:
+        return jsonify({'success': False, 'error': f'Invalid interval: {interval}'}), 400
+
+    url = request.args.get('url')
+    endpoints = rollups.summarize_range(
+        current_user.id, start, end,
+        method=request.args.get('method'),
+        url_template=rollups.normalize_url_template(url) if url else None,
+        interval=interval
+    )
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'endpoints': endpoints
+    })
+
+
+def init_app(app):
+    """Register the application's routes"""
+    app.before_request(make_session_permanent)
+    app.add_url_rule('/login', view_func=login, methods=['GET', 'POST'])
+    app.add_url_rule('/signup', view_func=signup, methods=['GET', 'POST'])
+    app.add_url_rule('/logout', view_func=logout)
+    app.add_url_rule('/landing', view_func=landing)
+    app.add_url_rule('/', view_func=index)
+    app.add_url_rule('/collections', view_func=collections)
+    app.add_url_rule('/environments', view_func=environments)
+    app.add_url_rule('/history', view_func=history)
+    app.add_url_rule('/send_request', view_func=send_request, methods=['POST'])
+    app.add_url_rule('/save_request', view_func=save_request, methods=['POST'])
+    app.add_url_rule('/create_collection', view_func=create_collection, methods=['POST'])
+    app.add_url_rule('/delete_collection/<int:collection_id>', view_func=delete_collection, methods=['POST'])
+    app.add_url_rule('/create_environment', view_func=create_environment, methods=['POST'])
+    app.add_url_rule('/activate_environment/<int:env_id>', view_func=activate_environment, methods=['POST'])
+    app.add_url_rule('/delete_environment/<int:env_id>', view_func=delete_environment, methods=['POST'])
+    app.add_url_rule('/load_request/<int:request_id>', view_func=load_request)
+    app.add_url_rule('/export_collection/<int:collection_id>', view_func=export_collection)
+    app.add_url_rule('/import_collection', view_func=import_collection, methods=['POST'])
+    app.add_url_rule('/upload_file', view_func=upload_file, methods=['POST'])
+    app.add_url_rule('/files', view_func=list_files)
+    app.add_url_rule('/delete_file/<int:file_id>', view_func=delete_file, methods=['POST'])
+    app.add_url_rule('/clear_history', view_func=clear_history, methods=['POST'])
+    app.add_url_rule('/analytics', view_func=analytics)
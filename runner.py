@@ -0,0 +1,222 @@
+"""Run a saved collection from the command line and write JUnit/JSON reports.
+
+    python runner.py collection.json --environment env.json --parallel 4 \\
+        --junit report.xml --json report.json
+    python runner.py --collection-id 3 --env-name staging
+
+Running from an exported JSON file only imports the HTTP client; the Flask app
+and database are loaded only when --collection-id is used.
+"""
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import json_backend
+from api_client import ApiClient
+from retry_policy import RequestPolicy
+from uploads import guess_content_type
+
+
+def load_collection_file(path):
+    with open(path, 'rb') as f:
+        return json_backend.loads(f.read())
+
+
+def load_environment_file(path):
+    """Accept an exported environment ({"variables": {...}}) or a plain dict"""
+    with open(path, 'rb') as f:
+        data = json_backend.loads(f.read())
+    if isinstance(data, dict) and isinstance(data.get('variables'), dict):
+        return data['variables']
+    return data
+
+
+def load_from_database(collection_id, env_name=None):
+    """Load a collection, environment and uploaded files through the app's models"""
+    from app import create_app, db
+    from models import Collection, Environment, UploadedFile
+
+    app = create_app()
+
+    with app.app_context():
+        collection = db.session.get(Collection, collection_id)
+        if collection is None:
+            raise SystemExit(f'Collection {collection_id} not found')
+
+        query = Environment.query.filter_by(user_id=collection.user_id)
+        if env_name:
+            environment = query.filter_by(name=env_name).first()
+            if environment is None:
+                raise SystemExit(f'Environment "{env_name}" not found')
+        else:
+            environment = query.filter_by(is_active=True).first()
+
+        upload_folder = app.config['UPLOAD_FOLDER']
+        files = {
+            f.id: f.get_file_info(upload_folder)
+            for f in UploadedFile.query.filter_by(user_id=collection.user_id).all()
+        }
+        environment_vars = dict(environment.get_variables()) if environment else {}
+        return collection.to_dict(), environment_vars, files
+
+
+def run_request(client, collection, request_data, environment_vars, files=None):
+    """Send one request and summarize the outcome"""
+    policy = RequestPolicy.merged(collection.get('policy'), request_data.get('policy'))
+    result = client.send_request(
+        method=request_data.get('method', 'GET'),
+        url=request_data.get('url', ''),
+        headers=dict(request_data.get('headers') or {}),
+        body=request_data.get('body') or '',
+        body_type=request_data.get('body_type') or 'json',
+        auth_type=request_data.get('auth_type') or '',
+        auth_data=dict(request_data.get('auth_data') or {}),
+        environment_vars=environment_vars,
+        policy=policy,
+        files=files,
+    )
+
+    status_code = result.get('status_code')
+    if not result['success']:
+        failure = result.get('error', 'Unknown error')
+    elif status_code >= 400:
+        failure = f'HTTP {status_code} {result.get("status_text", "")}'.strip()
+    else:
+        failure = None
+
+    return {
+        'name': request_data.get('name', 'Untitled Request'),
+        'method': request_data.get('method', 'GET').upper(),
+        'url': result.get('request', {}).get('url') or client.replace_environment_variables(
+            request_data.get('url', ''), environment_vars),
+        'status_code': status_code,
+        'protocol': result.get('protocol'),
+        'response_time': result.get('response_time', 0),
+        'size': result.get('size'),
+        'passed': failure is None,
+        'error': result.get('error'),
+        'failure': failure,
+        'attempts': result.get('attempts', []),
+    }
+
+
+def run_collection(collection, environment_vars=None, parallel=1, transport='http1', files=None):
+    """Run every request in the collection; results keep the collection order"""
+    client = ApiClient(transport=transport)
+    requests_data = collection.get('requests', [])
+    started_at = datetime.now(timezone.utc)
+    start = time.time()
+
+    def run(request_data):
+        return run_request(client, collection, request_data, environment_vars or {}, files)
+
+    if parallel > 1:
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            results = list(pool.map(run, requests_data))
+    else:
+        results = [run(request_data) for request_data in requests_data]
+
+    passed = sum(1 for result in results if result['passed'])
+    return {
+        'collection': collection.get('name', 'Collection'),
+        'started_at': started_at.isoformat(),
+        'duration': time.time() - start,
+        'summary': {
+            'total': len(results),
+            'passed': passed,
+            'failed': len(results) - passed,
+        },
+        'results': results,
+    }
+
+
+def junit_report(report):
+    """Render a run report as JUnit XML"""
+    suite = ET.Element('testsuite', {
+        'name': report['collection'],
+        'tests': str(report['summary']['total']),
+        'failures': str(sum(1 for r in report['results'] if not r['passed'] and not r['error'])),
+        'errors': str(sum(1 for r in report['results'] if r['error'])),
+        'time': f'{report["duration"]:.3f}',
+        'timestamp': report['started_at'],
+    })
+    for result in report['results']:
+        case = ET.SubElement(suite, 'testcase', {
+            'classname': report['collection'],
+            'name': f'{result["method"]} {result["name"]}',
+            'time': f'{result["response_time"]:.3f}',
+        })
+        if result['error']:
+            ET.SubElement(case, 'error', {'message': result['failure']}).text = result['url']
+        elif not result['passed']:
+            ET.SubElement(case, 'failure', {'message': result['failure']}).text = result['url']
+    return ET.tostring(suite, encoding='unicode', xml_declaration=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Run an API collection headlessly.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('collection_file', nargs='?', help='exported collection JSON file')
+    source.add_argument('--collection-id', type=int, help='collection id in the app database')
+    parser.add_argument('--environment', help='environment JSON file')
+    parser.add_argument('--env-name', help='environment name in the database (with --collection-id)')
+    parser.add_argument('--var', action='append', default=[], metavar='KEY=VALUE',
+                        help='set an environment variable (repeatable)')
+    parser.add_argument('--file', action='append', default=[], metavar='ID=PATH',
+                        help='local file for an "@file:<id>" body reference (repeatable)')
+    parser.add_argument('--parallel', type=int, default=1, help='number of requests in flight')
+    parser.add_argument('--transport', choices=['http1', 'http2'], default='http1',
+                        help='outbound transport; http2 multiplexes requests per origin')
+    parser.add_argument('--junit', help='write a JUnit XML report to this path')
+    parser.add_argument('--json', help='write a JSON report to this path')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.collection_id is not None:
+        collection, environment_vars, files = load_from_database(args.collection_id, args.env_name)
+    else:
+        collection = load_collection_file(args.collection_file)
+        environment_vars = {}
+        files = {}
+    for assignment in args.file:
+        file_id, _, path = assignment.partition('=')
+        files[int(file_id)] = {
+            'path': path,
+            'filename': os.path.basename(path),
+            'content_type': guess_content_type(path),
+        }
+    if args.environment:
+        environment_vars = load_environment_file(args.environment)
+    for assignment in args.var:
+        key, _, value = assignment.partition('=')
+        environment_vars[key] = value
+
+    report = run_collection(collection, environment_vars, parallel=max(1, args.parallel),
+                            transport=args.transport, files=files)
+
+    for result in report['results']:
+        status = 'PASS' if result['passed'] else 'FAIL'
+        detail = result['status_code'] if result['passed'] else result['failure']
+        print(f'{status}  {result["method"]:6s} {result["name"]}  ({detail}, {result["response_time"]:.3f}s)')
+    summary = report['summary']
+    print(f'\n{summary["passed"]}/{summary["total"]} passed in {report["duration"]:.2f}s')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(json_backend.dumps(report, indent=2))
+    if args.junit:
+        with open(args.junit, 'w') as f:
+            f.write(junit_report(report))
+
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
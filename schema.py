@@ -0,0 +1,31 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+
+def add_missing_columns(engine, metadata):
+    """Add nullable columns that exist on the models but not in the database.
+
+    db.create_all() only creates missing tables, so databases created before a
+    column was introduced need it added in place. Only nullable columns without
+    server-side constraints are handled; anything else needs a real migration.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added.append(f'{table.name}.{column.name}')
+
+    if added:
+        logging.getLogger(__name__).info('Added columns: %s', ', '.join(added))
+    return added
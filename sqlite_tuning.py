@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+# Connect-time pragmas for file-backed SQLite databases. WAL lets readers
+# proceed while a writer holds the lock, NORMAL sync is safe under WAL, and
+# the busy timeout makes writers wait instead of failing with "database is locked".
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # milliseconds
+    'mmap_size': 268435456,  # 256 MiB
+    'temp_store': 'MEMORY',
+}
+
+
+def is_sqlite_uri(uri):
+    """Check whether a database URI points at SQLite"""
+    return bool(uri) and uri.startswith('sqlite')
+
+
+def get_sqlite_pragmas():
+    """Build the pragma set, allowing overrides from the environment"""
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    if os.environ.get('SQLITE_BUSY_TIMEOUT_MS'):
+        pragmas['busy_timeout'] = int(os.environ['SQLITE_BUSY_TIMEOUT_MS'])
+    if os.environ.get('SQLITE_MMAP_SIZE'):
+        pragmas['mmap_size'] = int(os.environ['SQLITE_MMAP_SIZE'])
+    if os.environ.get('SQLITE_SYNCHRONOUS'):
+        pragmas['synchronous'] = os.environ['SQLITE_SYNCHRONOUS']
+    return pragmas
+
+
+def sqlite_engine_options(pragmas=None):
+    """Engine options for SQLite; the driver timeout mirrors busy_timeout"""
+    pragmas = pragmas or get_sqlite_pragmas()
+    return {
+        'pool_pre_ping': True,
+        'connect_args': {
+            'timeout': pragmas.get('busy_timeout', 5000) / 1000.0,
+        },
+    }
+
+
+def install_sqlite_pragmas(engine, pragmas=None):
+    """Run the pragmas on every new DBAPI connection made by the engine"""
+    pragmas = pragmas or get_sqlite_pragmas()
+    if engine.url.database in (None, '', ':memory:'):
+        # WAL and mmap are meaningless for in-memory databases
+        pragmas = {k: v for k, v in pragmas.items() if k not in ('journal_mode', 'mmap_size')}
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    return engine
+
+
+class SingleWriter:
+    """Serialize writes within a process so only one thread at a time waits on
+    the SQLite write lock; other processes are handled by busy_timeout."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+
+    @contextmanager
+    def __call__(self):
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            yield
+
+
+# Used around history inserts, which are the hot write path
+history_writer = SingleWriter()
@@ -2,6 +2,8 @@
 
 class ApiTester {
     constructor() {
+        // Saved request shown in the form; its (and its collection's) policy applies on send
+        this.loadedRequestId = null;
         this.init();
     }
 
@@ -32,6 +34,11 @@ class ApiTester {
             bodyTypeSelect.addEventListener('change', (e) => this.handleBodyTypeChange(e));
         }
 
+        const uploadFileBtn = document.getElementById('uploadFileBtn');
+        if (uploadFileBtn) {
+            uploadFileBtn.addEventListener('click', () => this.uploadBodyFile());
+        }
+
         // Save request form
         const saveRequestForm = document.getElementById('saveRequestForm');
         if (saveRequestForm) {
@@ -132,7 +139,51 @@ class ApiTester {
                 case 'raw':
                     bodyTextarea.placeholder = 'Raw text content...';
                     break;
+                case 'multipart':
+                    bodyTextarea.placeholder = 'field=value\nfile=@file:1';
+                    break;
+                case 'binary':
+                    bodyTextarea.placeholder = '@file:1';
+                    break;
+            }
+        }
+
+        const uploadGroup = document.getElementById('fileUploadGroup');
+        if (uploadGroup) {
+            uploadGroup.classList.toggle('d-none', bodyType !== 'multipart' && bodyType !== 'binary');
+        }
+    }
+
+    async uploadBodyFile() {
+        const fileInput = document.getElementById('bodyFile');
+        const file = fileInput && fileInput.files[0];
+        if (!file) {
+            this.showToast('Choose a file to upload', 'warning');
+            return;
+        }
+
+        try {
+            // Send the file as the raw request body so the server can stream it to disk
+            const response = await fetch(`/upload_file?filename=${encodeURIComponent(file.name)}`, {
+                method: 'POST',
+                headers: { 'Content-Type': file.type || 'application/octet-stream' },
+                body: file
+            });
+            const result = await response.json();
+            if (!response.ok) {
+                throw new Error(result.error || 'Upload failed');
             }
+
+            const bodyTextarea = document.getElementById('requestBody');
+            if (document.getElementById('bodyType').value === 'binary') {
+                bodyTextarea.value = result.reference;
+            } else {
+                const line = `file=${result.reference}`;
+                bodyTextarea.value = bodyTextarea.value ? `${bodyTextarea.value}\n${line}` : line;
+            }
+            this.showToast(`Uploaded ${result.filename}`, 'success');
+        } catch (error) {
+            this.showToast(`Upload error: ${error.message}`, 'danger');
         }
     }
 
@@ -200,6 +251,9 @@ class ApiTester {
             formData.append('body_type', document.getElementById('bodyType').value);
             formData.append('auth_type', document.getElementById('authType').value);
             formData.append('auth_data', JSON.stringify(this.collectAuthData()));
+            if (this.loadedRequestId) {
+                formData.append('request_id', this.loadedRequestId);
+            }
 
             // Send request
             const response = await fetch('/send_request', {
@@ -337,6 +391,7 @@ class ApiTester {
 
             const requestData = await response.json();
             this.populateForm(requestData);
+            this.loadedRequestId = requestData.id;
         } catch (error) {
             console.error('Error loading request:', error);
             alert('Failed to load request');
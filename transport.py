@@ -0,0 +1,143 @@
+import threading
+from abc import ABC, abstractmethod
+
+import requests
+
+
+USER_AGENT = 'PostmanClone/1.0'
+
+_HTTP_VERSIONS = {9: 'HTTP/0.9', 10: 'HTTP/1.0', 11: 'HTTP/1.1', 20: 'HTTP/2'}
+
+
+class Transport(ABC):
+    """Sends one HTTP request for ApiClient.
+
+    request() takes the same keyword arguments as requests.Session.request()
+    and returns an object with status_code, reason, headers, content and text,
+    plus `protocol` (e.g. 'HTTP/1.1'). Failures are raised as
+    requests.exceptions so retry policies classify them the same way.
+    """
+
+    name = None
+
+    @abstractmethod
+    def request(self, method, url, headers=None, data=None, timeout=None, allow_redirects=True):
+        """Send the request and return a response"""
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """HTTP/1.1 over a requests.Session connection pool"""
+
+    name = 'http1'
+
+    def __init__(self, session=None):
+        self.session = session or requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+
+    def request(self, method, url, headers=None, data=None, timeout=None, allow_redirects=True):
+        response = self.session.request(method=method, url=url, headers=headers, data=data,
+                                        timeout=timeout, allow_redirects=allow_redirects)
+        version = getattr(response.raw, 'version', None)
+        response.protocol = _HTTP_VERSIONS.get(version, 'HTTP/1.1')
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+class HTTP2Response:
+    """requests-like view of an httpx response"""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.reason = response.reason_phrase
+        self.headers = response.headers
+        self.content = response.content
+        self.protocol = response.http_version
+        self._response = response
+
+    @property
+    def text(self):
+        return self._response.text
+
+
+class HTTP2Transport(Transport):
+    """HTTP/2 via httpx: concurrent requests to the same origin are multiplexed
+    as streams over one connection. Servers that only speak HTTP/1.1 are still
+    reached through ALPN fallback.
+
+    prior_knowledge=True speaks HTTP/2 directly over cleartext (h2c), for
+    local servers without TLS.
+
+    httpx is imported here rather than at module level, so the default http1
+    transport does not pay for it.
+    """
+
+    name = 'http2'
+
+    def __init__(self, prior_knowledge=False, max_connections=100):
+        try:
+            import httpx
+        except ImportError:  # optional dependency: pip install "httpx[http2]"
+            raise RuntimeError('The http2 transport requires httpx: pip install "httpx[http2]"') from None
+        self.httpx = httpx
+        self.client = httpx.Client(
+            http1=not prior_knowledge,
+            http2=True,
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    def request(self, method, url, headers=None, data=None, timeout=None, allow_redirects=True):
+        httpx = self.httpx
+        kwargs = {}
+        if isinstance(data, dict):
+            kwargs['data'] = data
+        elif data is not None:
+            kwargs['content'] = data
+
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+
+        try:
+            response = self.client.request(method, url, headers=headers, timeout=timeout,
+                                           follow_redirects=allow_redirects, **kwargs)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(str(e)) from e
+        except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError) as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e)) from e
+        return HTTP2Response(response)
+
+    def close(self):
+        self.client.close()
+
+
+TRANSPORTS = {
+    'http1': RequestsTransport,
+    'http2': HTTP2Transport,
+}
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_transport(name):
+    """Process-wide transport for name, so connections are shared across
+    ApiClient instances ('http1' gets a fresh session per call, as before)"""
+    if name not in TRANSPORTS:
+        raise ValueError(f'Unknown transport: {name}')
+    if name == 'http1':
+        return RequestsTransport()
+    with _shared_lock:
+        transport = _shared.get(name)
+        if transport is None:
+            transport = _shared[name] = TRANSPORTS[name]()
+    return transport
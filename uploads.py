@@ -0,0 +1,124 @@
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# Request bodies refer to uploaded files as "@file:<id>"
+FILE_REFERENCE = re.compile(r'^@file:(\d+)$')
+
+
+def store_stream(stream, directory):
+    """Copy a stream to a new file in directory in chunks.
+
+    Returns (stored_name, size, sha256 hex digest).
+    """
+    os.makedirs(directory, exist_ok=True)
+    stored_name = uuid.uuid4().hex
+    path = os.path.join(directory, stored_name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return stored_name, size, digest.hexdigest()
+
+
+def guess_content_type(filename):
+    return mimetypes.guess_type(filename or '')[0] or 'application/octet-stream'
+
+
+def parse_form_lines(body):
+    """Split key=value lines, as used by form and multipart bodies"""
+    fields = []
+    for line in (body or '').split('\n'):
+        if '=' in line:
+            key, value = line.split('=', 1)
+            fields.append((key.strip(), value.strip()))
+    return fields
+
+
+def file_references(body_type, body):
+    """Ids of uploaded files referenced by a binary or multipart body"""
+    if body_type == 'binary':
+        values = [(body or '').strip()]
+    elif body_type == 'multipart':
+        values = [value for _, value in parse_form_lines(body)]
+    else:
+        return set()
+    return {int(match.group(1)) for match in map(FILE_REFERENCE.match, values) if match}
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class FileBody:
+    """Request body streamed from a file on disk.
+
+    Iterable but without a length, so it is sent with chunked transfer
+    encoding; each iteration reopens the file, so retries resend it in full.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        return read_chunks(self.path, self.chunk_size)
+
+
+class MultipartBody:
+    """multipart/form-data body generated part by part, with file parts
+    streamed from disk rather than assembled in memory.
+
+    fields is a list of (name, value) where value is a str or a file info dict
+    with 'path', 'filename' and 'content_type'.
+    """
+
+    def __init__(self, fields, chunk_size=CHUNK_SIZE):
+        self.fields = fields
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __iter__(self):
+        for name, value in self.fields:
+            name = name.replace('"', '%22')
+            if isinstance(value, dict):
+                filename = (value.get('filename') or 'file').replace('"', '%22')
+                yield (
+                    f'--{self.boundary}\r\n'
+                    f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                    f'Content-Type: {value.get("content_type") or "application/octet-stream"}\r\n\r\n'
+                ).encode('utf-8')
+                yield from read_chunks(value['path'], self.chunk_size)
+                yield b'\r\n'
+            else:
+                yield (
+                    f'--{self.boundary}\r\n'
+                    f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                    f'{value}\r\n'
+                ).encode('utf-8')
+        yield f'--{self.boundary}--\r\n'.encode('utf-8')